@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Load Test for the Restaurant Assistant
+- Simulates N customers chatting at the same time, each following a scripted dialog
+- Drives the app's own run_restaurant_chat (and its local intent fast path) on one event loop,
+  the way the Streamlit app's background loop does
+- Replaces OpenAI with MockModelClient, which streams canned replies after a configurable latency
+- Reports p50/p95/p99 turn latency, throughput and prompt tokens per turn, with failed turns counted apart
+- Checks the local intent router against INTENT_CASES first, and stops if any case regressed
+
+No OpenAI key or network access is needed.
+
+Usage:
+    python load_test.py
+    python load_test.py --sessions 200 --latency 1.5 --jitter 0.3
+    python load_test.py --sessions 50 --team-mode --no-fast-paths
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import io
+import math
+import os
+import random
+import time
+import uuid
+from typing import Any, AsyncGenerator, Dict, List, Literal, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    ChatCompletionClient, CreateResult, LLMMessage, ModelCapabilities, ModelFamily, ModelInfo, RequestUsage, UserMessage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from streamlit import logger as streamlit_logger
+
+os.environ.setdefault("OPENAI_API_KEY", "load-test")  # Never sent anywhere: every call goes to the mock
+streamlit_logger.set_log_level("error")  # Cached helpers warn about the missing Streamlit session otherwise
+
+import restaurant_app as app
+
+
+DIALOGS = [
+    [
+        "Hi there!",
+        "What vegetarian dishes do you have?",
+        "Is the Vegetable Risotto very rich?",
+        "I'd like to order one Vegetable Risotto and two Tiramisu for takeout",
+        "Yes, please confirm the order",
+    ],
+    [
+        "Tell me about your restaurant hours and location",
+        "What dishes do you recommend for a date night?",
+        "Which wine goes well with the Grilled Salmon?",
+        "Can I reserve a table for 4 on Friday?",
+    ],
+    [
+        "Can you show me the full menu?",
+        "Is the tiramisu made in house?",
+        "Do you have anything without gluten for dessert?",
+        "I'd like to order a Margherita Pizza for delivery",
+        "Add a Panna Cotta and please confirm",
+    ],
+    [
+        "Any specials today?",
+        "Is the tiramisu made in house?",
+        "What's in the Seafood Linguine?",
+        "Thanks, that's all!",
+    ],
+]
+
+# Messages the local intent router must answer with the given intent, or leave to the agent (None):
+# a template that does not address the question is a confident wrong answer
+INTENT_CASES = [
+    ("Can you show me the full menu?", "menu"),
+    ("What's on your menu?", "menu"),
+    ("Can I see the dessert menu?", "category"),
+    ("What vegetarian dishes do you have?", "dietary"),
+    ("Are you open on Sunday?", "hours"),
+    ("When do you close?", "hours"),
+    ("Where are you located?", "location"),
+    ("Tell me about your restaurant hours and location", "hours+location"),
+    ("Do you have kids menu?", None),
+    ("Menu for coffee", None),
+    ("Is the location wheelchair accessible?", None),
+    ("Are you open on Christmas?", None),
+    ("Is there parking close by?", None),
+    ("Is the carbonara vegetarian?", None),
+    ("I'd like two vegetarian pizzas delivered", None),
+]
+
+# How run_restaurant_chat() words a turn that failed (no client, an agent or team error, every specialist timed out)
+ERROR_REPLY_PREFIXES = ("⚠️", "I apologize, I'm having trouble", "I'm sorry, our team is taking too long")
+
+# Prompt tokens of every model call made for the current turn (set per turn by the harness)
+TURN_CALLS: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("turn_calls", default=None)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class MockModelClient(ChatCompletionClient):
+    """
+    Stand-in for OpenAIChatCompletionClient that never leaves the process.
+
+    Each call waits a random latency in latency * (1 ± jitter), plus a prefill
+    cost per 1k prompt tokens, then returns a canned reply. Streamed calls
+    send the first chunk after ttft of that time and the rest spread over the
+    remainder. A reply to a message asking to confirm contains an ORDER_JSON
+    block (with wrong totals, as models often produce), so local pricing runs too.
+    """
+
+    def __init__(self, latency: float = 0.8, ttft: float = 0.25, jitter: float = 0.25,
+                 prefill_ms_per_1k: float = 40.0, reply_words: int = 60, seed: int = 0):
+        self.latency = latency
+        self.ttft = ttft
+        self.jitter = jitter
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.reply_words = reply_words
+        self._rng = random.Random(seed)
+        self._total = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._last = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self.calls = 0
+
+    def _prompt_tokens(self, messages: Sequence[LLMMessage]) -> int:
+        return sum(app.count_tokens(str(message.content)) + app.TOKENS_PER_MESSAGE for message in messages)
+
+    def _reply(self, messages: Sequence[LLMMessage]) -> str:
+        last_user = next((str(m.content) for m in reversed(messages) if isinstance(m, UserMessage)), "")
+        words = " ".join(["Certainly, here is what La Bella Italia can offer you today."] * (self.reply_words // 10 + 1))
+        reply = " ".join(words.split()[:self.reply_words])
+        if "confirm" in last_user.lower():
+            reply += (
+                '\n```ORDER_JSON\n{"items": [{"name": "Tiramisu", "price": 8.99, "quantity": 2}], '
+                '"subtotal": 17.00, "tax": 1.50, "total": 18.50, "order_type": "takeout"}\n```\n'
+                "Please review your order and confirm."
+            )
+        return reply + " TERMINATE"
+
+    def _begin(self, messages: Sequence[LLMMessage]):
+        prompt_tokens = self._prompt_tokens(messages)
+        calls = TURN_CALLS.get()
+        if calls is not None:
+            calls.append(prompt_tokens)
+        self.calls += 1
+        delay = self.latency * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+        delay += prompt_tokens / 1000 * self.prefill_ms_per_1k / 1000
+        return prompt_tokens, delay
+
+    def _finish(self, prompt_tokens: int, reply: str) -> CreateResult:
+        usage = RequestUsage(prompt_tokens=prompt_tokens, completion_tokens=app.count_tokens(reply))
+        self._last = usage
+        self._total = RequestUsage(
+            prompt_tokens=self._total.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._total.completion_tokens + usage.completion_tokens,
+        )
+        return CreateResult(finish_reason="stop", content=reply, usage=usage, cached=False)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        prompt_tokens, delay = self._begin(messages)
+        await asyncio.sleep(delay)
+        return self._finish(prompt_tokens, self._reply(messages))
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        prompt_tokens, delay = self._begin(messages)
+        reply = self._reply(messages)
+        words = reply.split(" ")
+        chunks = [" ".join(words[i:i + 4]) + " " for i in range(0, len(words), 4)]
+        await asyncio.sleep(delay * self.ttft)
+        pause = delay * (1 - self.ttft) / max(len(chunks) - 1, 1)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(pause)
+            yield chunk
+        yield self._finish(prompt_tokens, reply)
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._last
+
+    def total_usage(self) -> RequestUsage:
+        return self._total
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._prompt_tokens(messages)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 128000 - self._prompt_tokens(messages)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return {"vision": False, "function_calling": True, "json_output": False}  # type: ignore
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return ModelInfo(vision=False, function_calling=True, json_output=False,
+                         family=ModelFamily.UNKNOWN, structured_output=False)
+
+
+def new_session_state(team_mode: bool) -> Dict[str, Any]:
+    """Chat state of a fresh session, as init_session_state() sets it up."""
+    return {
+        "session_id": uuid.uuid4().hex,
+        "messages": [],
+        "pending_order": None,
+        "awaiting_confirmation": False,
+        "turn_latencies": [],
+        "last_request": [],
+        "conversation_summary": app.ConversationSummary(),
+        "team_mode": team_mode,
+    }
+
+
+async def run_session(index: int, args, turns: List[Dict[str, Any]], errors: List[str]):
+    """Play one scripted dialog, the way main() handles each message."""
+    rng = random.Random(args.seed + index)
+    state = new_session_state(args.team_mode)
+    # Stagger session starts so they do not all send their first message at once
+    await asyncio.sleep(rng.uniform(0, args.ramp_up))
+
+    for message in DIALOGS[index % len(DIALOGS)]:
+        state["messages"].append({"role": "user", "content": message})
+        calls: List[int] = []
+        token = TURN_CALLS.set(calls)
+        started = time.perf_counter()
+        path = "local"
+        response = app.answer_locally(message, bool(state["pending_order"])) if args.fast_paths else None
+        if response is None:
+            try:
+                response = await app.run_restaurant_chat(message, state)
+            except Exception as e:
+                response = f"⚠️ {e!r}"
+            if response.startswith(ERROR_REPLY_PREFIXES):
+                path = "error"
+                errors.append(response)
+            else:
+                path = "model" if calls else "cache"
+        latency = time.perf_counter() - started
+        TURN_CALLS.reset(token)
+
+        state["messages"].append({"role": "assistant", "content": response})
+        # An order awaiting confirmation is confirmed by the customer before the next message
+        state["pending_order"] = None
+        state["awaiting_confirmation"] = False
+        turns.append({"path": path, "latency": latency, "calls": len(calls), "prompt_tokens": sum(calls)})
+        await asyncio.sleep(rng.uniform(0, args.think_time))
+
+
+async def run_load_test(args, turns: List[Dict[str, Any]], errors: List[str]) -> float:
+    """Run every session concurrently and return the wall-clock time."""
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(i, args, turns, errors) for i in range(args.sessions)))
+    return time.perf_counter() - started
+
+
+def check_intent_router() -> List[str]:
+    """Run INTENT_CASES through the router; returns a description of each mismatch."""
+    failures = []
+    for message, expected in INTENT_CASES:
+        routed = app.route_intent(message)
+        intent = routed[0] if routed else None
+        if intent != expected:
+            failures.append(f"{message!r}: expected {expected or 'agent'}, got {intent or 'agent'}")
+    return failures
+
+
+def print_latency_row(label: str, latencies: List[float]):
+    if not latencies:
+        return
+    print(f"{label:<14} {len(latencies):<8} {percentile(latencies, 50):<10.3f} {percentile(latencies, 95):<10.3f} "
+          f"{percentile(latencies, 99):<10.3f} {max(latencies):<10.3f}")
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Concurrent-session load test with a mock model client")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent customer sessions (default: 50)")
+    parser.add_argument("--latency", type=float, default=0.8, help="Mean model call latency in seconds (default: 0.8)")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Latency spread as a fraction (default: 0.25)")
+    parser.add_argument("--ttft", type=float, default=0.25, help="Share of the latency before the first chunk (default: 0.25)")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=40.0, help="Extra latency per 1k prompt tokens in ms")
+    parser.add_argument("--reply-words", type=int, default=60, help="Words in each mock reply (default: 60)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max seconds a customer waits between messages")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="Seconds over which sessions start (default: 1.0)")
+    parser.add_argument("--team-mode", action="store_true", help="Use the specialist team instead of one assistant")
+    parser.add_argument("--no-fast-paths", dest="fast_paths", action="store_false",
+                        help="Send every message to the model (no local intents, no FAQ cache)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's per-turn log lines")
+    return parser.parse_args()
+
+
+def main():
+    """Run the load test and print the report."""
+    args = parse_args()
+    mock = MockModelClient(args.latency, args.ttft, args.jitter, args.prefill_ms_per_1k, args.reply_words, args.seed)
+    # Builds the process-wide pool that run_restaurant_chat uses, with the mock as its client factory
+    app.get_client_pool(_factory=lambda api_key: mock)
+    if not args.fast_paths:
+        app.get_response_cache().max_entries = 0
+
+    if args.fast_paths:
+        failures = check_intent_router()
+        if failures:
+            print("Intent router regressions:\n" + "\n".join(f"  {failure}" for failure in failures))
+            raise SystemExit(1)
+
+    print(f"Load test: {args.sessions} sessions, {'team mode' if args.team_mode else 'unified assistant'}, "
+          f"mock latency {args.latency:.2f}s ±{args.jitter:.0%}, fast paths {'on' if args.fast_paths else 'off'}")
+
+    turns: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        elapsed = asyncio.run(run_load_test(args, turns, errors))
+
+    latencies = [turn["latency"] for turn in turns]
+    model_turns = [turn for turn in turns if turn["path"] == "model"]
+    by_path = {path: sum(1 for turn in turns if turn["path"] == path) for path in ("model", "local", "cache", "error")}
+
+    print(f"\n{len(turns)} turns in {elapsed:.2f}s: {len(turns) / elapsed:.1f} turns/s, "
+          f"{mock.calls / elapsed:.1f} model calls/s")
+    print(f"Answered by the model: {by_path['model']}, local intents: {by_path['local']}, "
+          f"FAQ cache: {by_path['cache']}, failed: {by_path['error']}")
+    if errors:
+        print(f"First error: {errors[0][:200]}")
+
+    print(f"\n{'Turn latency':<14} {'Turns':<8} {'p50 (s)':<10} {'p95 (s)':<10} {'p99 (s)':<10} {'max (s)':<10}")
+    print('─' * 64)
+    print_latency_row("all", latencies)
+    print_latency_row("model", [turn["latency"] for turn in model_turns])
+    print_latency_row("local", [turn["latency"] for turn in turns if turn["path"] == "local"])
+    print_latency_row("cache", [turn["latency"] for turn in turns if turn["path"] == "cache"])
+    print_latency_row("error", [turn["latency"] for turn in turns if turn["path"] == "error"])
+
+    if model_turns:
+        prompt_tokens = [turn["prompt_tokens"] for turn in model_turns]
+        total = mock.total_usage()
+        print(f"\nPrompt tokens per model turn: mean {sum(prompt_tokens) / len(prompt_tokens):,.0f}, "
+              f"p50 {percentile(prompt_tokens, 50):,}, p95 {percentile(prompt_tokens, 95):,}, max {max(prompt_tokens):,}")
+        print(f"Prompt tokens per turn (all turns): {total.prompt_tokens / len(turns):,.0f}")
+        print(f"Model calls: {mock.calls:,} ({mock.calls / len(model_turns):.2f} per model turn), "
+              f"{total.prompt_tokens:,} prompt + {total.completion_tokens:,} completion tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,33 @@ A conversational AI system for a food restaurant using AutoGen agents.
 
 import streamlit as st
 import asyncio
+import bisect
+import copy
+import datetime
+import hashlib
 import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Sequence
-from dataclasses import dataclass
+from typing import List, Dict, Any, Callable, Coroutine, MutableMapping, Sequence
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import json
 
+import tiktoken
+from autogen_core import CancellationToken
+from autogen_core.models import AssistantMessage, ChatCompletionClient, SystemMessage, UserMessage
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.conditions import TextMentionTermination, MaxMessageTermination
-from autogen_agentchat.messages import TextMessage, ChatMessage
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import TextMessage, ChatMessage, ModelClientStreamingChunkEvent, ToolCallExecutionEvent
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 
 load_dotenv()
@@ -177,17 +195,62 @@ After the specialist has helped, check if the customer needs anything else.
 
 When the conversation is truly complete (customer says goodbye/thanks/done), respond with "TERMINATE"."""
 
+UNIFIED_PROMPT_INTRO = """You are the AI Assistant for La Bella Italia, an Italian restaurant. 
+You handle ALL customer interactions including:
+
+1. **Greetings & General Info**: Welcome customers, provide restaurant hours, location, reservations
+2. **Menu Questions**: Explain dishes, prices, ingredients, dietary options (vegetarian, gluten-free)
+3. **Recommendations**: Suggest dishes based on preferences, wine pairings, popular items
+4. **Taking Orders**: Confirm items, calculate totals with 8.5% tax, handle modifications
+
+"""
+
+UNIFIED_PROMPT_GUIDELINES = """GUIDELINES:
+- Be warm, friendly, and professional
+- When recommending, explain WHY you're suggesting each dish
+- For orders: confirm items, ask about modifications/allergies, calculate totals accurately
+- Always include prices when discussing menu items
+- Look dishes up with the search_menu tool before describing or pricing them; never guess a price
+
+WHEN PLACING ORDERS:
+When customer confirms their order, format as JSON:
+```ORDER_JSON
+{
+    "items": [{"name": "Item", "price": 0.00, "quantity": 1, "modifications": ""}],
+    "subtotal": 0.00,
+    "tax": 0.00,
+    "total": 0.00,
+    "order_type": "dine-in/delivery/takeout",
+    "special_instructions": ""
+}
+```
+Then say "Please review your order and confirm."
+
+Respond naturally to the customer's message."""
+
 # ============== Helper Functions ==============
 
+def format_menu_item(item: dict) -> str:
+    """Format one menu item (name, price, dietary tags and description)."""
+    dietary = f" [{', '.join(item['dietary'])}]" if item['dietary'] else ""
+    return f"  • {item['name']} - ${item['price']:.2f}{dietary}\n    {item['description']}"
+
 def format_menu_for_prompt() -> str:
     """Format the menu dictionary as a readable string for agent prompts."""
     lines = []
     for category, items in MENU.items():
         lines.append(f"\n{category.upper().replace('_', ' ')}:")
         for item in items:
-            dietary = f" [{', '.join(item['dietary'])}]" if item['dietary'] else ""
-            lines.append(f"  • {item['name']} - ${item['price']:.2f}{dietary}")
-            lines.append(f"    {item['description']}")
+            lines.append(format_menu_item(item))
+    return "\n".join(lines)
+
+def format_menu_outline() -> str:
+    """Dish names by category, without prices or descriptions (those come from search_menu)."""
+    lines = []
+    for category, items in MENU.items():
+        lines.append(f"{category}: {', '.join(item['name'] for item in items)}")
+    tags = sorted({tag for items in MENU.values() for item in items for tag in item['dietary']})
+    lines.append(f"Dietary tags: {', '.join(tags)}")
     return "\n".join(lines)
 
 def format_specials_for_prompt() -> str:
@@ -214,6 +277,107 @@ def format_restaurant_info() -> str:
     lines.append(f"Features: {', '.join(info['special_features'])}")
     return "\n".join(lines)
 
+# ============== Prompt Fragments ==============
+
+@dataclass(frozen=True)
+class PromptFragment:
+    name: str
+    text: str
+    tokens: int
+
+@dataclass(frozen=True)
+class PromptFragments:
+    """Formatted restaurant data for the system prompt, stamped with the data version it came from."""
+    version: str
+    restaurant_info: PromptFragment
+    menu: PromptFragment
+    specials: PromptFragment
+    system_prompt: PromptFragment
+    full_menu_prompt: PromptFragment  # The same prompt with the whole menu inline, for comparison
+
+def compute_data_version() -> str:
+    """Short digest of MENU, SPECIALS and RESTAURANT_INFO; changes whenever any of them does."""
+    payload = json.dumps({"menu": MENU, "specials": SPECIALS, "info": RESTAURANT_INFO}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+# Hashing all the data costs more than the fragments it guards, so it is done once per
+# script run rather than on every cache lookup
+_data_version = compute_data_version()
+
+def get_data_version() -> str:
+    """Version of the restaurant data that the versioned caches are keyed by."""
+    return _data_version
+
+def notify_data_changed() -> str:
+    """Recompute the data version after MENU, SPECIALS or RESTAURANT_INFO were changed in place.
+
+    Every versioned cache (prompt fragments, menu index, price list, intent
+    answers, specialists, FAQ answers) rebuilds on its next lookup.
+    """
+    global _data_version
+    _data_version = compute_data_version()
+    return _data_version
+
+@st.cache_resource(show_spinner=False)
+def get_token_encoding():
+    """Tokenizer for MODEL_NAME, or None if its encoding file cannot be loaded (e.g. offline)."""
+    try:
+        return tiktoken.encoding_for_model(MODEL_NAME)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"Tokenizer unavailable, estimating token counts: {e}")
+        return None
+
+def count_tokens(text: str) -> int:
+    """Number of MODEL_NAME tokens in a string (about 4 characters per token without a tokenizer)."""
+    encoding = get_token_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_prompt_fragments(version: str) -> PromptFragments:
+    """Format and measure the prompt fragments once per data version."""
+    fragments = {}
+    for name, formatter in (
+        ("restaurant_info", format_restaurant_info),
+        ("menu", format_menu_outline),
+        ("specials", format_specials_for_prompt),
+    ):
+        text = formatter()
+        fragments[name] = PromptFragment(name, text, count_tokens(text))
+    system_prompt = build_unified_system_prompt(**fragments)
+    fragments["system_prompt"] = PromptFragment("system_prompt", system_prompt, count_tokens(system_prompt))
+    full_menu = format_menu_for_prompt()
+    full_menu_prompt = build_unified_system_prompt(
+        fragments["restaurant_info"], PromptFragment("menu", full_menu, count_tokens(full_menu)), fragments["specials"]
+    )
+    fragments["full_menu_prompt"] = PromptFragment("full_menu_prompt", full_menu_prompt, count_tokens(full_menu_prompt))
+    print(f"[prompt] data version {version}: " + ", ".join(f"{f.name}={f.tokens} tokens" for f in fragments.values()))
+    return PromptFragments(version=version, **fragments)
+
+def get_prompt_fragments() -> PromptFragments:
+    """Cached fragments for the current restaurant data."""
+    return build_prompt_fragments(get_data_version())
+
+def build_unified_system_prompt(restaurant_info: PromptFragment, menu: PromptFragment,
+                                specials: PromptFragment) -> str:
+    """Assemble the unified system prompt from the data fragments.
+
+    The prompt only depends on the restaurant data, so it is byte-identical
+    for every turn and every session of a data version. Conversation history
+    and the customer's message are sent as separate messages after it, which
+    keeps the whole system prompt eligible for the provider's prompt cache.
+    """
+    return "".join((
+        UNIFIED_PROMPT_INTRO,
+        "RESTAURANT INFO:\n", restaurant_info.text, "\n\n",
+        "MENU:\n", menu.text, "\n\n",
+        "TODAY'S SPECIALS:\n", specials.text, "\n\n",
+        UNIFIED_PROMPT_GUIDELINES,
+    ))
+
 def extract_order_json(response: str) -> dict | None:
     """Extract ORDER_JSON from agent response."""
     import re
@@ -226,6 +390,28 @@ def extract_order_json(response: str) -> dict | None:
             return None
     return None
 
+ORDER_JSON_FENCE = "```ORDER_JSON"
+HIDDEN_MARKERS = (ORDER_JSON_FENCE, "TERMINATE")
+
+def visible_response_text(response: str, partial: bool = False) -> str:
+    """Strip the ORDER_JSON block and TERMINATE from a response before showing it.
+
+    With partial=True the response is still being streamed: an ORDER_JSON
+    block that is not closed yet is hidden to the end, and so is a trailing
+    fragment that may turn out to be the start of a marker.
+    """
+    text = re.sub(r'```ORDER_JSON[\s\S]*?```', '', response).replace("TERMINATE", "")
+    if partial:
+        fence = text.find(ORDER_JSON_FENCE)
+        if fence != -1:
+            text = text[:fence]
+        for marker in HIDDEN_MARKERS:
+            for size in range(len(marker) - 1, 0, -1):
+                if text.endswith(marker[:size]):
+                    text = text[:-size]
+                    break
+    return text.strip()
+
 def format_order_for_display(order: dict) -> str:
     """Format order dict as readable string."""
     lines = ["📋 **Order Summary:**\n"]
@@ -234,7 +420,10 @@ def format_order_for_display(order: dict) -> str:
         name = item.get('name', 'Unknown')
         price = item.get('price', 0)
         mods = item.get('modifications', '')
-        lines.append(f"  • {qty}x {name} - ${price:.2f}")
+        flag = " ⚠️ _not on our menu_" if item.get('unknown') else ""
+        if item.get('invalid_quantity'):
+            flag += " ⚠️ _invalid quantity_"
+        lines.append(f"  • {qty}x {name} - ${price:.2f}{flag}")
         if mods:
             lines.append(f"    _Modifications: {mods}_")
     lines.append(f"\n**Subtotal:** ${order.get('subtotal', 0):.2f}")
@@ -245,6 +434,1180 @@ def format_order_for_display(order: dict) -> str:
         lines.append(f"**Special Instructions:** {order.get('special_instructions')}")
     return "\n".join(lines)
 
+# ============== Menu Index ==============
+
+def normalize_category(category: str) -> str:
+    """Map "Main Courses" or "main-courses" to the MENU key main_courses."""
+    return "_".join(category.lower().replace("-", " ").split())
+
+class MenuIndex:
+    """In-memory lookups over MENU for the search_menu tool.
+
+    Items are indexed by category and dietary tag (dicts), by price (a sorted
+    list searched with bisect) and by name: every word of every name is a key
+    in a sorted list, so a name prefix is one contiguous range. A query starts
+    from the smallest matching set and filters it by the others.
+    """
+
+    def __init__(self, menu: dict):
+        self.items: list[dict] = []
+        self.by_category: dict[str, list[dict]] = {}
+        self.by_dietary: dict[str, list[dict]] = {}
+        for category, items in menu.items():
+            for item in items:
+                entry = dict(item, category=category)
+                self.items.append(entry)
+                self.by_category.setdefault(category, []).append(entry)
+                for tag in item['dietary']:
+                    self.by_dietary.setdefault(tag, []).append(entry)
+
+        by_price = sorted(self.items, key=lambda entry: entry['price'])
+        self._prices = [entry['price'] for entry in by_price]
+        self._by_price = by_price
+
+        words = []
+        for entry in self.items:
+            name_words = entry['name'].lower().split()
+            for i in range(len(name_words)):
+                words.append((" ".join(name_words[i:]), entry['name']))
+        words.sort()
+        self._name_keys = [key for key, _ in words]
+        self._name_items = [name for _, name in words]
+        self._by_name = {entry['name']: entry for entry in self.items}
+
+    def _price_range(self, min_price: float | None, max_price: float | None) -> list[dict]:
+        low = bisect.bisect_left(self._prices, min_price) if min_price is not None else 0
+        high = bisect.bisect_right(self._prices, max_price) if max_price is not None else len(self._prices)
+        return self._by_price[low:high]
+
+    def _name_prefix(self, prefix: str) -> list[dict]:
+        prefix = " ".join(prefix.lower().split())
+        low = bisect.bisect_left(self._name_keys, prefix)
+        high = bisect.bisect_right(self._name_keys, prefix + "\uffff")
+        names = dict.fromkeys(self._name_items[low:high])
+        return [self._by_name[name] for name in names]
+
+    def search(self, category: str | None = None, dietary: str | None = None, min_price: float | None = None,
+               max_price: float | None = None, name_prefix: str | None = None) -> list[dict]:
+        """Items matching every given filter, in menu order (all items when no filter is given)."""
+        candidates = []
+        if category:
+            candidates.append(self.by_category.get(normalize_category(category), []))
+        if dietary:
+            candidates.append(self.by_dietary.get(dietary.strip().lower(), []))
+        if min_price is not None or max_price is not None:
+            candidates.append(self._price_range(min_price, max_price))
+        if name_prefix:
+            candidates.append(self._name_prefix(name_prefix))
+        if not candidates:
+            return list(self.items)
+
+        candidates.sort(key=len)
+        others = [{entry['name'] for entry in candidate} for candidate in candidates[1:]]
+        matches = {entry['name'] for entry in candidates[0] if all(entry['name'] in names for names in others)}
+        return [entry for entry in self.items if entry['name'] in matches]
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_menu_index(version: str) -> MenuIndex:
+    """Index the menu once per data version."""
+    return MenuIndex(MENU)
+
+def get_menu_index() -> MenuIndex:
+    """Cached index for the current restaurant data."""
+    return build_menu_index(get_data_version())
+
+async def search_menu(category: str = "", dietary: str = "", min_price: float | None = None,
+                      max_price: float | None = None, name_prefix: str = "") -> str:
+    """Look up dishes on the La Bella Italia menu with their prices, dietary tags and descriptions.
+
+    All filters are optional and combined; call with no filters for the full menu.
+    category: appetizers, main_courses, desserts or beverages.
+    dietary: vegetarian, vegan or gluten-free.
+    min_price / max_price: price range in dollars.
+    name_prefix: start of a word in the dish name, e.g. "tira" or "parm".
+    """
+    items = get_menu_index().search(category, dietary, min_price, max_price, name_prefix)
+    if not items:
+        return "No menu items match."
+    lines = []
+    for category_name in MENU:
+        matching = [item for item in items if item['category'] == category_name]
+        if matching:
+            lines.append(f"{category_name.upper().replace('_', ' ')}:")
+            lines.extend(format_menu_item(item) for item in matching)
+    return "\n".join(lines)
+
+# ============== Order Pricing ==============
+
+TAX_RATE_PER_MILLE = 85  # 8.5% sales tax
+
+def to_cents(amount) -> int | None:
+    """Dollar amount (number or string) as integer cents, rounded half up; None if it is not a number."""
+    try:
+        return int((Decimal(str(amount).strip().lstrip("$")) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        return None
+
+def tax_cents(subtotal_cents: int) -> int:
+    """8.5% tax on a subtotal, rounded half up to the cent."""
+    return (subtotal_cents * TAX_RATE_PER_MILLE + 500) // 1000
+
+def normalize_item_name(name: str) -> str:
+    """Lower-case a dish name and reduce punctuation to single spaces ("House Wine (Glass)" -> "house wine glass")."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split())
+
+MIN_PREFIX_LENGTH = 4  # Shortest name that may match a menu item by prefix
+
+class PriceList:
+    """Unit prices in cents for everything that can be ordered.
+
+    Covers every MENU item and the specials that have a per-person price
+    (e.g. the Chef's Tasting Menu). Names are matched after normalization,
+    then by a unique prefix of whole words, so "house wine" finds "House
+    Wine (Glass)" but "t" or "tira" finds nothing.
+    """
+
+    def __init__(self, menu: dict, specials: list):
+        self.prices: dict[str, tuple[str, int]] = {}
+        for items in menu.values():
+            for item in items:
+                self.prices[normalize_item_name(item['name'])] = (item['name'], to_cents(item['price']))
+        for special in specials:
+            match = re.search(r"\$(\d+(?:\.\d{2})?) per person", special['description'])
+            if match:
+                self.prices[normalize_item_name(special['name'])] = (special['name'], to_cents(match.group(1)))
+        self._keys = sorted(self.prices)
+
+    def lookup(self, name: str) -> tuple[str, int] | None:
+        """(canonical name, unit price in cents), or None for an unknown item."""
+        key = normalize_item_name(name)
+        if key in self.prices:
+            return self.prices[key]
+        if len(key) < MIN_PREFIX_LENGTH:
+            return None
+        low = bisect.bisect_left(self._keys, key)
+        high = bisect.bisect_right(self._keys, key + "\uffff")
+        # The prefix has to end where a word of the name ends
+        matches = [candidate for candidate in self._keys[low:high] if candidate[len(key)] == " "]
+        if len(matches) == 1:
+            return self.prices[matches[0]]
+        return None
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_price_list(version: str) -> PriceList:
+    """Index prices once per data version."""
+    return PriceList(MENU, SPECIALS)
+
+def get_price_list() -> PriceList:
+    """Cached price list for the current restaurant data."""
+    return build_price_list(get_data_version())
+
+def price_order(order: dict) -> tuple[dict, list[str]]:
+    """Check an ORDER_JSON order against the price list and recompute its totals locally.
+
+    Item names and unit prices are replaced with the menu's, and subtotal,
+    tax and total are recomputed in integer cents. Items with a quantity of
+    0 are dropped (the customer removed them). Items that are not on the
+    menu, or whose quantity is not a whole number of at least 1, are kept
+    but marked unknown or invalid_quantity and left out of the totals. If
+    items is not a list of objects, no item is kept and the order is marked
+    malformed. Either way the order cannot be confirmed until it is fixed.
+
+    Returns:
+        The corrected order (with an "issues" list) and the issues found
+    """
+    price_list = get_price_list()
+    issues = []
+    items = []
+    subtotal = 0
+    raw_items = order.get('items')
+    if raw_items is None:
+        raw_items = []
+    malformed = not isinstance(raw_items, list) or not all(isinstance(item, dict) for item in raw_items)
+    if malformed:
+        issues.append(f"Items of the order are not a list of dishes: {raw_items!r:.80}")
+        raw_items = []
+    for item in raw_items:
+        item = dict(item)
+        name = item.get('name', 'Unknown')
+
+        quantity = item.get('quantity', 1)
+        if isinstance(quantity, str) and quantity.strip().lstrip('-').isdigit():
+            quantity = int(quantity)
+        elif isinstance(quantity, float) and quantity.is_integer():
+            quantity = int(quantity)
+        valid_quantity = isinstance(quantity, int) and not isinstance(quantity, bool)
+        if valid_quantity and quantity == 0:
+            issues.append(f"{name} removed (quantity 0)")
+            continue
+        item['quantity'] = quantity
+        item.pop('invalid_quantity', None)
+        if not valid_quantity or quantity < 1:
+            issues.append(f"Quantity of {name} ({quantity!r}) is not a whole number of at least 1")
+            item['invalid_quantity'] = True
+            valid_quantity = False
+
+        match = price_list.lookup(name)
+        quoted = to_cents(item.get('price'))
+        if match is None:
+            issues.append(f"{name} is not on our menu")
+            item['price'] = (quoted or 0) / 100
+            item['unknown'] = True
+            items.append(item)
+            continue
+
+        item['name'], unit_cents = match
+        if quoted != unit_cents:
+            issues.append(f"Price of {item['name']} corrected from {item.get('price')!r} to ${unit_cents / 100:.2f}")
+        item['price'] = unit_cents / 100
+        item.pop('unknown', None)
+        if valid_quantity:
+            subtotal += unit_cents * quantity
+        items.append(item)
+
+    tax = tax_cents(subtotal)
+    totals = {"subtotal": subtotal, "tax": tax, "total": subtotal + tax}
+    corrected = dict(order, items=items)
+    corrected.pop('malformed', None)
+    if malformed:
+        corrected['malformed'] = True
+    for key, cents in totals.items():
+        if to_cents(order.get(key)) != cents:
+            issues.append(f"{key.title()} corrected from {order.get(key)!r} to ${cents / 100:.2f}")
+        corrected[key] = cents / 100
+    corrected['issues'] = issues
+    return corrected, issues
+
+# ============== Intent Router ==============
+
+# Questions whose answer is fully determined by the restaurant data are answered
+# from templates without a model call, but only when every word of the message
+# is part of an intent phrasing or filler below. Anything else (a dish, "kids
+# menu", "open on christmas", a follow-up, an order) goes to the agent.
+INTENT_PATTERNS = {
+    "menu": re.compile(r"\bmenu\b|\bwhat do you (serve|have)\b"),
+    "specials": re.compile(r"\b(specials?|deals?|promotions?)\b"),
+    # "close" on its own is too often about distance ("parking close by")
+    "hours": re.compile(r"\b(hours?|open|opening|closing|closed)\b|"
+                        r"\b(when|what time) (do|does|will) (you|the restaurant|the kitchen) close\b"),
+    "location": re.compile(r"\b(where|address|location|located|directions|parking|phone( number)?)\b"),
+}
+DIETARY_PATTERN = re.compile(r"\b(vegetarian|vegan|gluten[- ]?free)\b")
+CATEGORY_PATTERNS = {
+    "appetizers": re.compile(r"\b(appetizers?|starters?)\b"),
+    "main_courses": re.compile(r"\b(mains?|main courses?|entrees?)\b"),
+    "desserts": re.compile(r"\bdesserts?\b"),
+    "beverages": re.compile(r"\b(beverages?|drinks?)\b"),
+}
+AGENT_ONLY_PATTERN = re.compile(
+    r"\b(order\w*|buy|add|want|like|recommend\w*|suggest\w*|best|popular|favou?rite|pair\w*|reserv\w*|book\w*|"
+    r"table|cancel|modify|change|remove|allerg\w*|instead|without|price|cost|much|cheap\w*|it|that|this|those|they|them|"
+    r"get|give|deliver\w*|takeout|take[- ]?away|(?<!you )have|\d+|one|two|three|four|five|six|seven|eight|nine|ten|"
+    r"dozen|couple|few|several)\b"
+)
+ROUTER_FILLER_WORDS = frozenset("""
+    a an the is are am be do does can could would will you your you're we us our i i'm me my
+    what what's whats when where's which how tell show see about any anything there here have has got
+    and or of for on at in to from with all full whole some please kindly hi hello hey thanks thank
+    restaurant la bella italia place time times day days today tonight tomorrow now right currently weekend weekends
+    monday tuesday wednesday thursday friday saturday sunday dishes dish food options items serve offer available
+""".split())
+MAX_ROUTED_WORDS = 16
+ROUTED_FOLLOW_UP = "\n\nAnything else I can help you with?"
+
+def format_menu_answer(items: list[dict]) -> str:
+    """Markdown list of menu items grouped by category."""
+    lines = []
+    for category in MENU:
+        matching = [item for item in items if item['category'] == category]
+        if matching:
+            lines.append(f"\n**{category.replace('_', ' ').title()}**")
+            for item in matching:
+                dietary = f" _({', '.join(item['dietary'])})_" if item['dietary'] else ""
+                lines.append(f"- **{item['name']}** - ${item['price']:.2f}{dietary}: {item['description']}")
+    return "\n".join(lines)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_intent_answers(version: str) -> dict[str, str]:
+    """Render the fixed intent answers once per data version."""
+    info = RESTAURANT_INFO
+    hours = "\n".join(f"- {days}: {time_range}" for days, time_range in info['hours'].items())
+    specials = "\n".join(f"- **{special['name']}** ({special['days']}): {special['description']}" for special in SPECIALS)
+    return {
+        "menu": f"Here's our full menu:\n{format_menu_answer(get_menu_index().items)}",
+        "hours": f"**Opening hours**\n{hours}",
+        "location": (f"**Location**\n- Address: {info['address']}\n- Phone: {info['phone']}\n"
+                     f"- Parking: {info['parking']}"),
+        "specials": f"**Our specials**\n{specials}",
+    }
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_dish_pattern(version: str) -> re.Pattern:
+    """Words that name a menu dish ("carbonara", "pizzas"), once per data version.
+
+    Words that are also category or dietary filters ("drinks") are left out,
+    so "what drinks do you have?" does not count as naming a dish.
+    """
+    words = set()
+    for item in get_menu_index().items:
+        for word in re.findall(r"[a-z]+", item['name'].lower()):
+            if len(word) > 3 and not DIETARY_PATTERN.search(word) and not any(
+                pattern.search(word) for pattern in CATEGORY_PATTERNS.values()
+            ):
+                words.add(word)
+    return re.compile(r"\b(" + "|".join(sorted(words)) + r")s?\b")
+
+def route_intent(message: str) -> tuple[str, str] | None:
+    """Answer a message from templates when its intent is deterministic.
+
+    Returns:
+        (intent, answer), or None when the message should go to the agent
+    """
+    text = " ".join(re.sub(r"[^a-z0-9']+", " ", message.lower().replace("’", "'")).split())
+    if not text or len(text.split()) > MAX_ROUTED_WORDS or AGENT_ONLY_PATTERN.search(text):
+        return None
+
+    # A word outside the intent phrasings and filler is something the templates
+    # do not answer ("kids menu", "open on christmas", "wheelchair", a dish)
+    rest = text
+    for pattern in (DIETARY_PATTERN, *CATEGORY_PATTERNS.values(), *INTENT_PATTERNS.values()):
+        rest = pattern.sub(" ", rest)
+    if any(word not in ROUTER_FILLER_WORDS for word in rest.split()):
+        return None
+
+    dietary = DIETARY_PATTERN.search(text)
+    categories = [category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(text)]
+    intents = [intent for intent, pattern in INTENT_PATTERNS.items() if pattern.search(text)]
+    answers = build_intent_answers(get_data_version())
+    if dietary or categories:
+        # Dietary or category filter: "vegetarian desserts", "the dessert menu", "what drinks do you have?"
+        tag = None
+        if dietary:
+            tag = "gluten-free" if dietary.group(1).startswith("gluten") else dietary.group(1)
+        items = [item for item in get_menu_index().search(dietary=tag) if not categories or item['category'] in categories]
+        label = ", ".join(category.replace("_", " ") for category in categories) or "dishes"
+        if tag:
+            label = f"{tag} {label}"
+        if not items:
+            answer = f"Sorry, we don't have any {label} at the moment."
+        else:
+            answer = f"Here are our {label}:\n{format_menu_answer(items)}"
+        others = [intent for intent in intents if intent != "menu"]
+        answer = "\n\n".join([answer] + [answers[intent] for intent in others])
+        return "+".join(["dietary" if dietary else "category"] + others), answer + ROUTED_FOLLOW_UP
+
+    if not intents:
+        return None
+    return "+".join(intents), "\n\n".join(answers[intent] for intent in intents) + ROUTED_FOLLOW_UP
+
+class IntentStats:
+    """Process-wide counts of messages answered locally vs. sent to the agent."""
+
+    def __init__(self):
+        self.counts: Counter[str] = Counter()
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def record(self, intent: str | None) -> tuple[int, int]:
+        """Count one message; returns (local hits, total messages) so far."""
+        with self._lock:
+            self.counts[intent or "agent"] += 1
+            self.total += 1
+            return self.total - self.counts["agent"], self.total
+
+@st.cache_resource(show_spinner=False)
+def get_intent_stats() -> IntentStats:
+    """Process-wide intent statistics (survives Streamlit reruns)."""
+    return IntentStats()
+
+def answer_locally(user_message: str, order_pending: bool = False) -> str | None:
+    """Template answer for a deterministic intent (logged with the hit rate), or None.
+
+    While an order is pending every message goes to the agent, which can
+    take it as a change to the order.
+    """
+    started = time.perf_counter()
+    routed = None if order_pending else route_intent(user_message)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    intent = routed[0] if routed else None
+    hits, total = get_intent_stats().record(intent)
+    print(f"[intent] {intent or 'agent'} routed in {elapsed_ms:.3f} ms, "
+          f"local hit rate {hits}/{total} ({hits / total:.0%})")
+    return routed[1] if routed else None
+
+# ============== Order Store ==============
+
+ORDER_DB_PATH = os.getenv("RESTAURANT_ORDER_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "orders.db"))
+ORDER_WRITE_TIMEOUT = 15  # seconds place() waits for the writer before reporting an error
+
+ORDER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_number INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    order_type TEXT,
+    total_cents INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    created_date TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_by_date ON orders (created_date);
+CREATE INDEX IF NOT EXISTS orders_by_status ON orders (status, created_date);
+"""
+
+INSERT_ORDER_SQL = """
+INSERT INTO orders (session_id, status, order_type, total_cents, created_at, created_date, payload)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+class OrderStore:
+    """Append-only log of placed orders in SQLite (WAL mode).
+
+    Order numbers come from the table's AUTOINCREMENT key, so they are
+    unique, increasing and never reused, across every session, every process
+    sharing the database, and restarts. All writes go through one writer
+    thread: place() queues the order and waits, and the writer commits
+    everything queued so far in a single transaction, so a burst of orders
+    costs one fsync instead of one each. Readers use their own connection
+    and are not blocked by the writer. If the writer does not answer within
+    `timeout` seconds, place() raises instead of blocking the UI.
+    """
+
+    def __init__(self, path: str = ORDER_DB_PATH, batch_size: int = 64, timeout: float = ORDER_WRITE_TIMEOUT):
+        self.path = path
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue()
+
+        self._write_conn = self._connect()
+        self._write_conn.executescript(ORDER_SCHEMA)
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+
+        self._writer = threading.Thread(target=self._run_writer, name="order-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run_writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Orders whose place() already gave up (cancelled futures) are not written
+            requests = [request for request in batch if request is not None and request[1].set_running_or_notify_cancel()]
+            if requests:
+                self._write_batch(requests)
+            if None in batch:
+                self._write_conn.close()
+                return
+
+    def _write_batch(self, requests: list):
+        try:
+            self._write_conn.execute("BEGIN IMMEDIATE")
+            numbers = [self._write_conn.execute(INSERT_ORDER_SQL, row).lastrowid for row, _ in requests]
+            self._write_conn.execute("COMMIT")
+        except Exception as e:
+            try:
+                if self._write_conn.in_transaction:
+                    self._write_conn.execute("ROLLBACK")
+            except sqlite3.Error as rollback_error:
+                # Start over on a fresh connection rather than let the writer thread die
+                print(f"[order] rollback failed ({rollback_error}), reopening the order database")
+                try:
+                    self._write_conn.close()
+                    self._write_conn = self._connect()
+                except sqlite3.Error as reconnect_error:
+                    print(f"[order] could not reopen the order database: {reconnect_error}")
+            for _, future in requests:
+                future.set_exception(e)
+            return
+        for (_, future), number in zip(requests, numbers):
+            future.set_result(number)
+
+    def place(self, order: dict, session_id: str) -> int:
+        """Store an order and return its order number once it is committed.
+
+        Raises:
+            sqlite3.Error: if the write fails, or the writer does not answer within the timeout
+        """
+        now = datetime.datetime.now()
+        row = (
+            session_id, order.get('status', 'confirmed'), order.get('order_type'),
+            to_cents(order.get('total', 0)) or 0,
+            now.strftime("%Y-%m-%d %H:%M:%S"), now.date().isoformat(), json.dumps(order),
+        )
+        future: Future = Future()
+        self._queue.put((row, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise sqlite3.OperationalError(
+                    f"the order database did not respond within {self.timeout:g}s, the order was not placed") from None
+        # The writer picked the order up just as we gave up: its transaction is already running
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise sqlite3.OperationalError(
+                f"the order database did not respond within {2 * self.timeout:g}s, the order may still be saved") from None
+
+    def _query(self, sql: str, params: tuple) -> list[dict]:
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, params).fetchall()
+        orders = []
+        for number, status, created_at, payload in rows:
+            order = json.loads(payload)
+            order.update(order_number=number, status=status, created_at=created_at)
+            orders.append(order)
+        return orders
+
+    def orders_on(self, date: datetime.date, status: str | None = None, limit: int = 100) -> list[dict]:
+        """Orders placed on a date (optionally with a given status), newest first."""
+        if status is None:
+            return self._query(
+                "SELECT order_number, status, created_at, payload FROM orders WHERE created_date = ? "
+                "ORDER BY order_number DESC LIMIT ?", (date.isoformat(), limit))
+        return self._query(
+            "SELECT order_number, status, created_at, payload FROM orders WHERE status = ? AND created_date = ? "
+            "ORDER BY order_number DESC LIMIT ?", (status, date.isoformat(), limit))
+
+    def count_by_status(self, date: datetime.date) -> dict[str, int]:
+        """Number of orders per status on a date."""
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT status, count(*) FROM orders WHERE created_date = ? GROUP BY status", (date.isoformat(),)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Finish pending writes and close the database."""
+        self._queue.put(None)
+        self._writer.join()
+        with self._read_lock:
+            self._read_conn.close()
+
+@st.cache_resource(show_spinner=False)
+def get_order_store() -> OrderStore:
+    """Process-wide order store (survives Streamlit reruns)."""
+    return OrderStore()
+
+# ============== Background Event Loop ==============
+
+class BackgroundLoop:
+    """A long-lived asyncio event loop running in a daemon thread.
+
+    Streamlit runs each script rerun in its own thread, so a chat turn used to
+    call asyncio.run() and get a brand-new loop every time, and anything bound
+    to a loop (the OpenAI client's connection pool, the agents using it) died
+    with it. All sessions now submit their coroutines to this one loop.
+
+    Coroutines run here have no Streamlit script context: they must not call
+    st.* (other than context-free caches) and take their state explicitly.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="restaurant-event-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine from any thread and return a concurrent Future for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+@st.cache_resource(show_spinner=False)
+def get_background_loop() -> BackgroundLoop:
+    """Process-wide event loop (survives Streamlit reruns)."""
+    return BackgroundLoop()
+
+# ============== Model Client & Agent Pool ==============
+
+MODEL_NAME = "gpt-4o-mini"
+AGENT_IDLE_SECONDS = 30 * 60  # Drop a session's agent after 30 minutes without a message
+MAX_CACHED_AGENTS = 256
+
+class ClientPool:
+    """Model clients shared by every session in this process.
+
+    The OpenAI client keeps a pool of keep-alive HTTP connections, but those
+    connections belong to the event loop that opened them, so there is one
+    client per running event loop. A loop that is closed and garbage
+    collected drops its client with it.
+
+    factory builds a client for an API key; it defaults to the OpenAI client
+    (load_test.py passes a mock through get_client_pool()).
+    """
+
+    def __init__(self, factory: Callable[[str], ChatCompletionClient] | None = None):
+        self._factory = factory or self._openai_client
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _openai_client(api_key: str) -> OpenAIChatCompletionClient:
+        return OpenAIChatCompletionClient(
+            model=MODEL_NAME, api_key=api_key,
+            # Streamed replies only report token usage when asked to
+            stream_options={"include_usage": True},
+        )
+
+    def get(self, api_key: str) -> tuple[OpenAIChatCompletionClient, bool]:
+        """Return (client, reused) for the current event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._clients.get(loop)
+            if entry is not None and entry[0] == api_key:
+                return entry[1], True
+            client = self._factory(api_key)
+            self._clients[loop] = (api_key, client)
+            return client, False
+
+@dataclass
+class CachedAgent:
+    agent: AssistantAgent
+    model_client: OpenAIChatCompletionClient
+    prompt_digest: str
+    last_used: float
+
+class AgentCache:
+    """Per-session AssistantAgent cache with idle eviction.
+
+    A session has one agent per name (the unified assistant, or each
+    specialist in team mode). An agent is reused while its session keeps the
+    same model client and system prompt; otherwise it is rebuilt. Agents idle
+    for longer than idle_seconds are evicted, and the least recently used
+    goes first once max_agents is reached.
+    """
+
+    def __init__(self, idle_seconds: float = AGENT_IDLE_SECONDS, max_agents: int = MAX_CACHED_AGENTS):
+        self.idle_seconds = idle_seconds
+        self.max_agents = max_agents
+        self._agents: OrderedDict[tuple[str, str], CachedAgent] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_idle(self, now: float):
+        while self._agents:
+            key, entry = next(iter(self._agents.items()))
+            if now - entry.last_used < self.idle_seconds:
+                break
+            del self._agents[key]
+
+    def get(self, session_id: str, model_client: OpenAIChatCompletionClient, system_prompt: str,
+            name: str = "Restaurant_Assistant", tools: Sequence[Callable] = (search_menu,)) -> tuple[AssistantAgent, bool]:
+        """Return (agent, reused) for a session's agent with the given name."""
+        key = (session_id, name)
+        digest = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._agents.get(key)
+            if entry is not None and entry.model_client is model_client and entry.prompt_digest == digest:
+                entry.last_used = now
+                self._agents.move_to_end(key)
+                return entry.agent, True
+
+            agent = AssistantAgent(
+                name=name,
+                model_client=model_client,
+                system_message=system_prompt,
+                model_client_stream=True,
+                tools=list(tools),
+                reflect_on_tool_use=bool(tools),
+            )
+            self._agents[key] = CachedAgent(agent, model_client, digest, now)
+            self._agents.move_to_end(key)
+            while len(self._agents) > self.max_agents:
+                self._agents.popitem(last=False)
+            return agent, False
+
+    def discard(self, session_id: str):
+        """Forget a session's agents (e.g. when its chat is cleared)."""
+        with self._lock:
+            for key in [key for key in self._agents if key[0] == session_id]:
+                del self._agents[key]
+
+@st.cache_resource(show_spinner=False)
+def get_client_pool(_factory: Callable[[str], ChatCompletionClient] | None = None) -> ClientPool:
+    """Process-wide client pool (survives Streamlit reruns).
+
+    _factory (not part of the cache key) is only used by the first call,
+    which builds the pool; a harness passes it before any chat turn runs.
+    """
+    return ClientPool(_factory)
+
+@st.cache_resource(show_spinner=False)
+def get_agent_cache() -> AgentCache:
+    """Process-wide agent cache (survives Streamlit reruns)."""
+    return AgentCache()
+
+class SetupStats:
+    """Process-wide average time to get a turn's model client and agent, fresh vs. reused."""
+
+    def __init__(self):
+        self.totals = {"new": 0.0, "reused": 0.0}
+        self.counts = {"new": 0, "reused": 0}
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, reused: bool) -> dict[str, float | None]:
+        """Add one turn's setup time; returns the average (in seconds) of each kind so far."""
+        kind = "reused" if reused else "new"
+        with self._lock:
+            self.totals[kind] += seconds
+            self.counts[kind] += 1
+            return {k: self.totals[k] / self.counts[k] if self.counts[k] else None for k in self.totals}
+
+@st.cache_resource(show_spinner=False)
+def get_setup_stats() -> SetupStats:
+    """Process-wide setup timings (survives Streamlit reruns)."""
+    return SetupStats()
+
+def record_turn_latency(state: MutableMapping[str, Any], seconds: float, client_reused: bool, agent_reused: bool,
+                        first_token: float | None = None, setup: float | None = None):
+    """Keep per-turn latency for the sidebar and log it (with time to first token) to the console.
+
+    setup is the time spent getting the model client and agent before the
+    run; its running averages for freshly built vs. reused ones give the
+    before/after cost of building them on every message.
+    """
+    state["turn_latencies"].append(seconds)
+    ttft = f"{first_token:.2f}s" if first_token is not None else "n/a"
+    setup_text = ""
+    if setup is not None:
+        averages = get_setup_stats().record(setup, client_reused and agent_reused)
+        new, reused = (f"{averages[k] * 1000:.1f}ms" if averages[k] is not None else "n/a" for k in ("new", "reused"))
+        setup_text = f" setup={setup * 1000:.1f}ms (avg new={new} reused={reused})"
+    print(f"[turn] session={state['session_id'][:8]} latency={seconds:.2f}s ttft={ttft} "
+          f"client_reused={client_reused} agent_reused={agent_reused}{setup_text}")
+
+# OpenAI serves repeated prompt prefixes of at least 1024 tokens from its cache, in 128-token steps
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_INCREMENT = 128
+TOKENS_PER_MESSAGE = 3
+STREAM_RENDER_INTERVAL = 0.05  # Seconds between redraws of a streaming reply
+
+def estimate_cached_tokens(shared_prefix_tokens: int) -> int:
+    """Prompt tokens the provider can serve from its cache for a prefix it has already seen."""
+    if shared_prefix_tokens < PROMPT_CACHE_MIN_TOKENS:
+        return 0
+    return shared_prefix_tokens // PROMPT_CACHE_INCREMENT * PROMPT_CACHE_INCREMENT
+
+def record_prompt_metrics(state: MutableMapping[str, Any], fragments: PromptFragments,
+                          request: list[tuple[str, str]], prompt_tokens: int | None):
+    """Log the stable prefix length and the estimated cached-token ratio of a request.
+
+    The shared prefix is the run of leading messages identical to the
+    session's previous request (always at least the system prompt after the
+    first turn of a data version, since it is byte-stable). prompt_tokens is
+    the reported total over every model call of the turn, so a search_menu
+    lookup counts both the call and the reflection on its result.
+    """
+    message_tokens = [fragments.system_prompt.tokens + TOKENS_PER_MESSAGE]
+    message_tokens += [count_tokens(content) + TOKENS_PER_MESSAGE for _, content in request[1:]]
+    prompt_tokens = prompt_tokens or sum(message_tokens)
+
+    previous = state["last_request"]
+    shared_tokens = 0
+    for i, message in enumerate(request):
+        if i >= len(previous) or previous[i] != message:
+            break
+        shared_tokens += message_tokens[i]
+    state["last_request"] = request
+
+    cached = min(estimate_cached_tokens(shared_tokens), prompt_tokens)
+    # What the same request would cost with the whole menu in the system prompt
+    full_menu_tokens = sum(message_tokens) - fragments.system_prompt.tokens + fragments.full_menu_prompt.tokens
+    print(f"[prompt] version={fragments.version} stable_prefix={fragments.system_prompt.tokens} tokens "
+          f"shared_with_previous={shared_tokens} prompt={prompt_tokens} "
+          f"est_cached={cached} ({cached / prompt_tokens:.0%}) "
+          f"full_menu_layout={full_menu_tokens} saved={full_menu_tokens - prompt_tokens}")
+
+# ============== Conversation Memory ==============
+
+HISTORY_TOKEN_BUDGET = 800  # Recent messages sent verbatim with each turn
+MAX_SESSION_MESSAGES = 40  # Messages kept in session state; older ones go to the archive
+CHAT_ARCHIVE_DIR = os.getenv("RESTAURANT_CHAT_ARCHIVE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_archive"))
+
+ORDER_TYPE_PATTERN = re.compile(r"\b(delivery|deliver|takeout|take-out|take out|pickup|pick up|dine-in|dine in)\b")
+ALLERGY_PATTERN = re.compile(r"\b(?:allergic to|allergy to|allergies to|intolerant to)\s+([a-z][a-z ,-]*?)(?=[.!?;]|\s+(?:and|but|so)\s+i\b|$)")
+PARTY_SIZE_PATTERN = re.compile(r"\b(?:for|party of|table for)\s+(\d{1,2})\s*(?:people|persons|guests|of us)?\b")
+ORDER_NUMBER_PATTERN = re.compile(r"Order #(\d+)")
+ORDER_TYPES = {"deliver": "delivery", "take-out": "takeout", "take out": "takeout", "pick up": "takeout",
+               "pickup": "takeout", "dine in": "dine-in"}
+SUMMARY_MAX_DISHES = 15
+SUMMARY_MAX_REQUESTS = 5
+
+@dataclass
+class ConversationSummary:
+    """Rolling summary of the messages that no longer fit in the verbatim history.
+
+    Built locally, without a model call: each message leaving the window is
+    folded in once, keeping the details an order depends on (dishes the
+    customer mentioned, dietary needs, allergies, order type, party size,
+    confirmed order numbers) and the customer's last few requests.
+    """
+    dishes: list[str] = field(default_factory=list)
+    dietary: list[str] = field(default_factory=list)
+    allergies: list[str] = field(default_factory=list)
+    order_type: str | None = None
+    party_size: int | None = None
+    orders: list[str] = field(default_factory=list)
+    requests: list[str] = field(default_factory=list)
+    folded: int = 0
+
+    def fold(self, message: dict):
+        """Add one message's details to the summary."""
+        self.folded += 1
+        content = message["content"]
+        if message["role"] != "user":
+            for number in ORDER_NUMBER_PATTERN.findall(content):
+                if f"#{number}" not in self.orders:
+                    self.orders.append(f"#{number}")
+            return
+
+        text = content.lower()
+        normalized = f" {normalize_item_name(content)} "
+        for key, (name, _) in get_price_list().prices.items():
+            if f" {key} " in normalized and name not in self.dishes:
+                self.dishes.append(name)
+        del self.dishes[:-SUMMARY_MAX_DISHES]
+        for match in DIETARY_PATTERN.finditer(text):
+            tag = "gluten-free" if match.group(1).startswith("gluten") else match.group(1)
+            if tag not in self.dietary:
+                self.dietary.append(tag)
+        for match in ALLERGY_PATTERN.finditer(text):
+            allergy = match.group(1).strip(" ,")
+            if allergy and allergy not in self.allergies:
+                self.allergies.append(allergy)
+        if match := ORDER_TYPE_PATTERN.search(text):
+            self.order_type = ORDER_TYPES.get(match.group(1), match.group(1))
+        if match := PARTY_SIZE_PATTERN.search(text):
+            self.party_size = int(match.group(1))
+        request = " ".join(content.split())
+        self.requests.append(request if len(request) <= 120 else request[:117] + "...")
+        del self.requests[:-SUMMARY_MAX_REQUESTS]
+
+    def render(self) -> str:
+        """The summary as a system message for the agent."""
+        lines = [f"Summary of {self.folded} earlier messages in this conversation:"]
+        if self.dishes:
+            lines.append(f"- Dishes the customer mentioned: {', '.join(self.dishes)}")
+        if self.dietary:
+            lines.append(f"- Dietary needs: {', '.join(self.dietary)}")
+        if self.allergies:
+            lines.append(f"- Allergies: {', '.join(self.allergies)}")
+        if self.order_type:
+            lines.append(f"- Order type: {self.order_type}")
+        if self.party_size:
+            lines.append(f"- Party size: {self.party_size}")
+        if self.orders:
+            lines.append(f"- Orders already placed: {', '.join(self.orders)}")
+        if self.requests:
+            lines.append("- Customer's last earlier requests: " + " | ".join(f'"{request}"' for request in self.requests))
+        return "\n".join(lines)
+
+def message_tokens(message: dict) -> int:
+    """Tokens of a chat message, counted once and kept on the message."""
+    if "tokens" not in message:
+        message["tokens"] = count_tokens(message["content"]) + TOKENS_PER_MESSAGE
+    return message["tokens"]
+
+def build_history(messages: list[dict], summary: ConversationSummary) -> list[tuple[str, str]]:
+    """History for a turn: the newest messages that fit HISTORY_TOKEN_BUDGET, verbatim,
+    after the rolling summary of everything older.
+
+    Messages that fall out of the window are folded into the summary (once).
+    """
+    used = 0
+    start = len(messages)
+    while start > 0 and used + message_tokens(messages[start - 1]) <= HISTORY_TOKEN_BUDGET:
+        start -= 1
+        used += message_tokens(messages[start])
+
+    for message in messages[:start]:
+        if not message.get("summarized"):
+            summary.fold(message)
+            message["summarized"] = True
+
+    history = [(message["role"], message["content"]) for message in messages[start:]]
+    if summary.folded:
+        history.insert(0, ("system", summary.render()))
+    return history
+
+def archive_messages(session_id: str, messages: list[dict]):
+    """Append messages to the session's JSONL archive."""
+    os.makedirs(CHAT_ARCHIVE_DIR, exist_ok=True)
+    archived_at = datetime.datetime.now().isoformat(timespec="seconds")
+    with open(os.path.join(CHAT_ARCHIVE_DIR, f"{session_id}.jsonl"), "a", encoding="utf-8") as archive:
+        for message in messages:
+            archive.write(json.dumps({"role": message["role"], "content": message["content"],
+                                      "archived_at": archived_at}) + "\n")
+
+def trim_session_messages():
+    """Keep session state bounded: move the oldest messages beyond MAX_SESSION_MESSAGES
+    to the archive, folding them into the summary first."""
+    messages = st.session_state.messages
+    overflow = len(messages) - MAX_SESSION_MESSAGES
+    if overflow <= 0:
+        return
+    old = messages[:overflow]
+    for message in old:
+        if not message.get("summarized"):
+            st.session_state.conversation_summary.fold(message)
+            message["summarized"] = True
+    try:
+        archive_messages(st.session_state.session_id, old)
+    except OSError as e:
+        print(f"Could not archive messages: {e}")
+    del messages[:overflow]
+    st.session_state.archived_messages += overflow
+
+# ============== Specialist Team ==============
+
+SPECIALIST_TIMEOUT = 8.0  # Seconds a single specialist may take before it is skipped
+TEAM_TURN_BUDGET = 10.0  # Seconds for the whole turn, from before the model client is set up
+ORDER_CONTEXT_MESSAGES = 4  # Recent messages that keep the order specialist in an order conversation
+ORDER_TOPIC_PATTERN = re.compile(r"\b(order\w*|ORDER_JSON|subtotal|total)\b", re.IGNORECASE)
+
+@dataclass(frozen=True)
+class Specialist:
+    name: str
+    label: str
+    prompt: str
+    pattern: re.Pattern
+
+SPECIALIST_PATTERNS = {
+    "order": r"\b(order\w*|buy|add|place|checkout|cart|modify|confirm|total|takeout|pickup|deliver\w*|dine-in|"
+             r"\d+ ?x?|a couple of|a dozen|two|three|four|five|six|seven|eight|nine|ten|"
+             r"i'?ll have|i'?d like|can i get|give me|get me)\b",
+    "recommendations": r"\b(recommend\w*|suggest\w*|best|popular|favou?rite|pair\w*|wine|should i|choose|special\w*)\b",
+    "menu": r"\b(menu|dish\w*|ingredients?|vegetarian|vegan|gluten|allerg\w*|price|cost|contain\w*|appetizers?|mains?|desserts?|drinks?|beverages?)\b",
+    "host": r"\b(hours?|open|close\w*|where|address|location|parking|reserv\w*|book\w*|table|phone|hello|hi|hey|thanks?|thank you|bye)\b",
+}
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_specialists(version: str) -> dict[str, Specialist]:
+    """Specialist prompts, each with only the restaurant data it needs, once per data version."""
+    menu, specials, info = format_menu_for_prompt(), format_specials_for_prompt(), format_restaurant_info()
+    prompts = {
+        "order": ("Order_Agent", "🛒 Order Specialist", ORDER_AGENT_PROMPT.format(menu=menu)),
+        "recommendations": ("Recommendations_Agent", "🌟 Recommendations",
+                            RECOMMENDATIONS_AGENT_PROMPT.format(menu=menu, specials=specials)),
+        "menu": ("Menu_Agent", "📋 Menu Expert", MENU_AGENT_PROMPT.format(menu=menu, specials=specials)),
+        "host": ("Host_Agent", "👋 Host", HOST_AGENT_PROMPT.format(restaurant_info=info)),
+    }
+    return {
+        key: Specialist(name, label, prompt, re.compile(SPECIALIST_PATTERNS[key]))
+        for key, (name, label, prompt) in prompts.items()
+    }
+
+def order_in_progress(state: MutableMapping[str, Any], history: list[tuple[str, str]]) -> bool:
+    """Whether the customer is in the middle of an order: one is pending, or the
+    last ORDER_CONTEXT_MESSAGES messages talk about one."""
+    recent = [content for role, content in history if role != "system"][-ORDER_CONTEXT_MESSAGES:]
+    return bool(state["pending_order"]) or any(ORDER_TOPIC_PATTERN.search(content) for content in recent)
+
+def pick_specialists(user_message: str, state: MutableMapping[str, Any],
+                     history: list[tuple[str, str]]) -> list[Specialist]:
+    """The coordinator's routing, done locally: every specialist whose topics the message mentions.
+
+    Naming a dish or a quantity ("2 carbonara") involves the order
+    specialist, and so does every message while an order is in progress; a
+    message that matches nobody goes to the host.
+    """
+    version = get_data_version()
+    specialists = build_specialists(version)
+    text = user_message.lower().replace("’", "'")
+    ordering = order_in_progress(state, history) or bool(build_dish_pattern(version).search(text))
+    picked = [specialist for key, specialist in specialists.items()
+              if specialist.pattern.search(text) or (key == "order" and ordering)]
+    return picked or [specialists["host"]]
+
+async def seed_history(agent: AssistantAgent, reused: bool, history: list[tuple[str, str]]):
+    """Reset a reused agent and give it the conversation summary and recent messages as context."""
+    if reused:
+        await agent.on_reset(CancellationToken())
+    for role, content in history:
+        if role == "system":
+            await agent.model_context.add_message(SystemMessage(content=content))
+        elif role == "user":
+            await agent.model_context.add_message(UserMessage(content=content, source="user"))
+        else:
+            await agent.model_context.add_message(AssistantMessage(content=content, source=agent.name))
+
+async def ask_specialist(specialist: Specialist, user_message: str, state: MutableMapping[str, Any],
+                         model_client: OpenAIChatCompletionClient, history: list[tuple[str, str]]) -> tuple[str, bool]:
+    """Run one specialist on the message; returns (reply without TERMINATE, agent reused)."""
+    agent, reused = get_agent_cache().get(
+        state["session_id"], model_client, specialist.prompt, name=specialist.name, tools=()
+    )
+    await seed_history(agent, reused, history)
+    result = await agent.run(task=user_message)
+    reply = str(result.messages[-1].content) if result.messages else ""
+    return reply.replace("TERMINATE", "").strip(), reused
+
+async def run_team_chat(user_message: str, state: MutableMapping[str, Any], model_client: OpenAIChatCompletionClient,
+                        client_reused: bool, history: list[tuple[str, str]], turn_started: float) -> tuple[str, bool]:
+    """Fan the message out to the relevant specialists concurrently and merge their answers.
+
+    Each specialist gets SPECIALIST_TIMEOUT or whatever is left of the
+    turn's TEAM_TURN_BUDGET (counted from turn_started, a perf_counter()
+    reading), whichever is shorter; specialists that have not answered by
+    then are cancelled and left out of the merged reply.
+
+    Returns:
+        The merged reply, and whether every specialist asked contributed to it
+    """
+    specialists = pick_specialists(user_message, state, history)
+    started = time.perf_counter()
+    time_left = turn_started + TEAM_TURN_BUDGET - started
+    timeout = max(min(SPECIALIST_TIMEOUT, time_left), 0)
+    finished_at = {}
+
+    async def timed(specialist):
+        reply = await asyncio.wait_for(
+            ask_specialist(specialist, user_message, state, model_client, history), timeout
+        )
+        finished_at[specialist.name] = time.perf_counter() - started
+        return reply
+
+    tasks = [asyncio.create_task(timed(specialist)) for specialist in specialists]
+    await asyncio.wait(tasks)
+
+    answers, skipped, all_reused = [], [], True
+    for specialist, task in zip(specialists, tasks):
+        if isinstance(task.exception(), asyncio.TimeoutError):
+            limit = "over turn budget" if time_left < SPECIALIST_TIMEOUT else "timed out"
+            skipped.append(f"{specialist.name} ({limit} after {timeout:.1f}s)")
+        elif task.exception() is not None:
+            skipped.append(f"{specialist.name} ({task.exception()!r})")
+        elif not task.result()[0]:
+            skipped.append(f"{specialist.name} (empty reply)")
+        else:
+            reply, reused = task.result()
+            answers.append((specialist, reply))
+            all_reused = all_reused and reused
+
+    record_turn_latency(state, time.perf_counter() - started, client_reused, all_reused)
+    timings = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in finished_at.items())
+    print(f"[team] session={state['session_id'][:8]} asked={','.join(s.name for s in specialists)} "
+          f"answered: {timings or 'none'}" + (f" skipped: {'; '.join(skipped)}" if skipped else ""))
+
+    if not answers:
+        return "I'm sorry, our team is taking too long to answer right now. Please try again.", False
+    if len(answers) == 1:
+        return answers[0][1], not skipped
+    return "\n\n".join(f"**{specialist.label}**\n\n{reply}" for specialist, reply in answers), not skipped
+
+# ============== Response Cache ==============
+
+FAQ_TTL_SECONDS = 60 * 60
+FAQ_MAX_ENTRIES = 512
+
+# A turn that depends on the conversation (an order, a follow-up that refers
+# back to earlier messages) or on the customer ("is it safe for me?") is never
+# answered from the cache
+CONTEXTUAL_PATTERN = re.compile(
+    r"\b(order\w*|buy|add|cart|checkout|modify|change|cancel|remove|confirm\w*|instead|also|too|again|more|another|"
+    r"same|it|that|this|those|these|they|them|one)\b"
+)
+PERSONAL_PATTERN = re.compile(r"\b(i|i'm|i'd|i'll|i've|me|my|mine|myself|we|we're|we'd|we'll|we've|us|our|ours)\b")
+TIME_SENSITIVE_PATTERN = re.compile(r"\b(specials?|deals?|today|tonight|tomorrow|now)\b")
+FILLER_WORDS = frozenset({"hi", "hello", "hey", "please", "thanks", "thank", "you", "can", "could", "would", "kindly"})
+
+def normalize_question(text: str) -> str:
+    """Lower-case a question and drop punctuation and filler words ("Hi! Do you have gluten-free options?" ->
+    "do have gluten free options")."""
+    words = re.sub(r"[^a-z0-9'$]+", " ", text.lower().replace("’", "'")).split()
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+class ResponseCache:
+    """Process-wide LRU cache of answers with a time-to-live, shared by every session."""
+
+    def __init__(self, ttl_seconds: float = FAQ_TTL_SECONDS, max_entries: int = FAQ_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> str | None:
+        """Cached answer for a key, or None if it is missing or has expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] >= self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, response: str):
+        """Store an answer, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def hit_rate(self) -> str:
+        lookups = self.hits + self.misses
+        return f"{self.hits}/{lookups} ({self.hits / lookups:.0%})" if lookups else "0/0"
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache (survives Streamlit reruns)."""
+    return ResponseCache()
+
+def faq_cache_key(user_message: str, state: MutableMapping[str, Any], history: list[tuple[str, str]]) -> tuple | None:
+    """Cache key for a turn whose answer depends only on the question and the restaurant data.
+
+    The key is the normalized question, the data version, the weekday for
+    questions about specials or today, and the chat mode. Returns None for
+    turns whose answer could be personal: an order pending or under way in
+    the recent messages, allergies the customer mentioned (which the agent
+    takes into account), a message that refers back to earlier turns, or one
+    about the customer ("can I eat the tiramisu?").
+    """
+    if state["awaiting_confirmation"] or order_in_progress(state, history):
+        return None
+    if state["conversation_summary"].allergies or any(
+        role == "user" and ALLERGY_PATTERN.search(content.lower()) for role, content in history
+    ):
+        return None
+    if PERSONAL_PATTERN.search(user_message.lower().replace("’", "'")):
+        return None
+    question = normalize_question(user_message)
+    if not question or CONTEXTUAL_PATTERN.search(question):
+        return None
+    weekday = datetime.date.today().weekday() if TIME_SENSITIVE_PATTERN.search(question) else None
+    return question, get_data_version(), weekday, state["team_mode"]
+
+def store_faq_response(key: tuple | None, response: str, state: MutableMapping[str, Any]) -> str:
+    """Cache a finished answer under its FAQ key (unless it proposed an order) and return it.
+
+    key is None for every turn faq_cache_key() would not serve from the
+    cache, so answers that depend on the conversation are never stored.
+    """
+    if key is not None and not state["pending_order"]:
+        get_response_cache().put(key, response)
+    return response
+
 # ============== Streamlit App ==============
 
 def init_session_state():
@@ -261,91 +1624,116 @@ def init_session_state():
         st.session_state.order_history = []
     if "awaiting_confirmation" not in st.session_state:
         st.session_state.awaiting_confirmation = False
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "turn_latencies" not in st.session_state:
+        st.session_state.turn_latencies = []
+    if "last_request" not in st.session_state:
+        st.session_state.last_request = []
+    if "team_mode" not in st.session_state:
+        st.session_state.team_mode = False
+    if "conversation_summary" not in st.session_state:
+        st.session_state.conversation_summary = ConversationSummary()
+    if "archived_messages" not in st.session_state:
+        st.session_state.archived_messages = 0
+
+# Session state a chat turn reads or updates; see submit_chat()
+CHAT_STATE_KEYS = ("session_id", "messages", "pending_order", "awaiting_confirmation", "turn_latencies", "last_request",
+                   "conversation_summary")
+# Settings a turn reads but never changes (team_mode belongs to a sidebar widget)
+CHAT_SETTING_KEYS = ("team_mode",)
 
-async def run_restaurant_chat(user_message: str) -> str:
-    """Run the multi-agent chat system and return the response."""
+async def run_restaurant_chat(user_message: str, state: MutableMapping[str, Any],
+                              on_text: Callable[[str], None] | None = None) -> str:
+    """Run the multi-agent chat system and return the response.
+
+    Args:
+        user_message: The customer's message
+        state: The session's chat state (the CHAT_STATE_KEYS and
+            CHAT_SETTING_KEYS entries); a proposed order is stored in its
+            pending_order entry
+        on_text: Called with the text generated so far while the reply
+            streams in, already stripped of the ORDER_JSON block and TERMINATE
+    """
     
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         return "⚠️ OpenAI API key not found. Please set OPENAI_API_KEY in your .env file."
     
     try:
-        # Create the model client
-        model_client = OpenAIChatCompletionClient(
-            model="gpt-4o-mini",
-            api_key=api_key
-        )
+        # Reuse this event loop's model client (and its keep-alive connections)
+        setup_started = time.perf_counter()
+        model_client, client_reused = get_client_pool().get(api_key)
+        client_setup = time.perf_counter() - setup_started
     except Exception as e:
         return f"⚠️ Error creating model client: {str(e)}"
     
-    # Format data for prompts
-    menu_str = format_menu_for_prompt()
-    specials_str = format_specials_for_prompt()
-    restaurant_info_str = format_restaurant_info()
+    # Menu, specials and restaurant info are formatted once per data version
+    fragments = get_prompt_fragments()
     
-    # Build conversation history for context
-    history = []
-    for msg in st.session_state.messages[-6:]:  # Last 3 exchanges
-        if msg["role"] == "user":
-            history.append(f"Customer: {msg['content']}")
-        else:
-            history.append(f"Assistant: {msg['content']}")
-    
-    history_str = "\n".join(history) if history else "No previous conversation."
-    
-    # Create a comprehensive restaurant assistant agent
-    unified_system_prompt = f"""You are the AI Assistant for La Bella Italia, an Italian restaurant. 
-You handle ALL customer interactions including:
+    # The summary and recent history go after the system prompt as separate messages (the
+    # current customer message is already the last entry in session state, and is the task)
+    past = state["messages"]
+    if past and past[-1]["role"] == "user" and past[-1]["content"] == user_message:
+        past = past[:-1]
+    history = build_history(past, state["conversation_summary"])
 
-1. **Greetings & General Info**: Welcome customers, provide restaurant hours, location, reservations
-2. **Menu Questions**: Explain dishes, prices, ingredients, dietary options (vegetarian, gluten-free)
-3. **Recommendations**: Suggest dishes based on preferences, wine pairings, popular items
-4. **Taking Orders**: Confirm items, calculate totals with 8.5% tax, handle modifications
+    # Repeated questions that do not depend on the conversation are answered from the shared cache
+    faq_key = faq_cache_key(user_message, state, history)
+    if faq_key is not None:
+        cache = get_response_cache()
+        cached = cache.get(faq_key)
+        print(f"[faq] session={state['session_id'][:8]} {'hit' if cached else 'miss'} "
+              f"\"{faq_key[0]}\", hit rate {cache.hit_rate()}")
+        if cached is not None:
+            return cached
 
-RESTAURANT INFO:
-{restaurant_info_str}
-
-FULL MENU:
-{menu_str}
-
-TODAY'S SPECIALS:
-{specials_str}
-
-PREVIOUS CONVERSATION:
-{history_str}
-
-GUIDELINES:
-- Be warm, friendly, and professional
-- When recommending, explain WHY you're suggesting each dish
-- For orders: confirm items, ask about modifications/allergies, calculate totals accurately
-- Always include prices when discussing menu items
-
-WHEN PLACING ORDERS:
-When customer confirms their order, format as JSON:
-```ORDER_JSON
-{{
-    "items": [{{"name": "Item", "price": 0.00, "quantity": 1, "modifications": ""}}],
-    "subtotal": 0.00,
-    "tax": 0.00,
-    "total": 0.00,
-    "order_type": "dine-in/delivery/takeout",
-    "special_instructions": ""
-}}
-```
-Then say "Please review your order and confirm."
-
-Respond naturally to the customer's message."""
+    if state["team_mode"]:
+        try:
+            response_text, complete = await run_team_chat(user_message, state, model_client, client_reused, history,
+                                                         setup_started)
+        except Exception as e:
+            import traceback
+            print(f"Team error: {traceback.format_exc()}")
+            return f"I apologize, I'm having trouble right now. Error: {str(e)}"
+        return store_faq_response(faq_key if complete else None, finish_response(response_text, state), state)
 
     try:
-        # Create the unified assistant agent
-        restaurant_agent = AssistantAgent(
-            name="Restaurant_Assistant",
-            model_client=model_client,
-            system_message=unified_system_prompt,
+        # Reuse the session's assistant agent while its prompt and client are unchanged
+        setup_started = time.perf_counter()
+        restaurant_agent, agent_reused = get_agent_cache().get(
+            state["session_id"], model_client, fragments.system_prompt.text
         )
+        setup = client_setup + time.perf_counter() - setup_started
+        await seed_history(restaurant_agent, agent_reused, history)
         
-        # Run the agent
-        result = await restaurant_agent.run(task=user_message)
+        # Run the agent, streaming partial text to the caller
+        started = time.perf_counter()
+        first_token = None
+        last_render = 0.0
+        streamed = ""
+        result = None
+        async for event in restaurant_agent.run_stream(task=user_message):
+            if isinstance(event, ModelClientStreamingChunkEvent):
+                now = time.perf_counter()
+                if first_token is None:
+                    first_token = now - started
+                streamed += event.content
+                if on_text is not None and now - last_render >= STREAM_RENDER_INTERVAL:
+                    on_text(visible_response_text(streamed, partial=True))
+                    last_render = now
+            elif isinstance(event, ToolCallExecutionEvent):
+                # The reply is streamed again by the reflection on the tool result
+                streamed = ""
+            elif isinstance(event, TaskResult):
+                result = event
+        record_turn_latency(state, time.perf_counter() - started, client_reused, agent_reused, first_token, setup)
+        usages = [msg.models_usage for msg in result.messages if msg.models_usage]
+        record_prompt_metrics(
+            state, fragments,
+            [("system", fragments.system_prompt.text)] + history + [("user", user_message)],
+            sum(usage.prompt_tokens for usage in usages) if usages else None,
+        )
         
         response_text = ""
         
@@ -364,19 +1752,48 @@ Respond naturally to the customer's message."""
         print(f"Agent error: {traceback.format_exc()}")
         return f"I apologize, I'm having trouble right now. Error: {str(e)}"
     
+    return store_faq_response(faq_key if response_text else None, finish_response(response_text, state), state)
+
+def finish_response(response_text: str, state: MutableMapping[str, Any]) -> str:
+    """Move a proposed order into the state for human review and return the text to show."""
     # Check if response contains an order for human review
     order_data = extract_order_json(response_text)
-    if order_data:
-        st.session_state.pending_order = order_data
-        st.session_state.awaiting_confirmation = True
+    if isinstance(order_data, dict) and order_data:
+        # Prices and totals are always recomputed locally, never trusted from the model
+        order_data, issues = price_order(order_data)
+        if issues:
+            print(f"[order] session={state['session_id'][:8]} corrected: " + "; ".join(issues))
+        state["pending_order"] = order_data
+        state["awaiting_confirmation"] = True
         # Clean up the response to remove JSON block
-        import re
-        clean_response = re.sub(r'```ORDER_JSON[\s\S]*?```', '', response_text).strip()
-        clean_response = clean_response.replace("TERMINATE", "").strip()
+        clean_response = visible_response_text(response_text)
         return clean_response if clean_response else "I've prepared your order for review. Please confirm below."
     
     return response_text if response_text else "How can I assist you today?"
 
+def submit_chat(user_message: str, on_text: Callable[[str], None]) -> str:
+    """Run a chat turn on the background loop from the script thread.
+
+    The turn works on a deep copy of the session's chat state, so the loop
+    thread never mutates the lists and dicts the script thread renders
+    (session_state itself cannot be used from the loop thread). The copy is
+    written back once the turn finishes; a turn that raises leaves the
+    session untouched. Streamed text is handed back through a queue so that
+    on_text (which draws Streamlit elements) runs on the script thread.
+    """
+    state = copy.deepcopy({key: st.session_state[key] for key in CHAT_STATE_KEYS + CHAT_SETTING_KEYS})
+    chunks: queue.Queue[str | None] = queue.Queue()
+    future = get_background_loop().submit(run_restaurant_chat(user_message, state, on_text=chunks.put))
+    future.add_done_callback(lambda _: chunks.put(None))
+
+    while (text := chunks.get()) is not None:
+        on_text(text)
+    response = future.result()
+
+    for key in CHAT_STATE_KEYS:
+        st.session_state[key] = state[key]
+    return response
+
 def display_pending_order():
     """Display pending order with human-in-the-loop confirmation."""
     if st.session_state.pending_order and st.session_state.awaiting_confirmation:
@@ -390,6 +1807,20 @@ def display_pending_order():
         with st.container():
             st.markdown(format_order_for_display(order))
         
+        unknown_items = [item.get('name', 'Unknown') for item in order.get('items', []) if item.get('unknown')]
+        invalid_items = [item.get('name', 'Unknown') for item in order.get('items', []) if item.get('invalid_quantity')]
+        blocked = bool(unknown_items or invalid_items or not order.get('items') or order.get('malformed'))
+        if unknown_items:
+            st.error(f"Not on our menu: {', '.join(unknown_items)}. Please modify the order before confirming.")
+        if invalid_items:
+            st.error(f"Invalid quantity for: {', '.join(invalid_items)}. Please modify the order before confirming.")
+        if order.get('malformed'):
+            st.error("This order could not be read. Please modify the order before confirming.")
+        elif not order.get('items'):
+            st.error("This order has no items. Please modify the order before confirming.")
+        if not blocked and order.get('issues'):
+            st.caption("Prices and totals were checked against the menu and corrected.")
+        
         # Editable fields for human modification
         st.markdown("### ✏️ Modify Order (Optional)")
         
@@ -412,15 +1843,19 @@ def display_pending_order():
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            if st.button("✅ Confirm Order", type="primary", use_container_width=True):
+            if st.button("✅ Confirm Order", type="primary", use_container_width=True, disabled=blocked):
                 # Update order with any modifications
                 order['order_type'] = new_order_type
                 order['special_instructions'] = special_instructions
                 
-                # Save to order history
-                import datetime
+                # Save to the order log, which allocates the order number
                 order['confirmed_at'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 order['status'] = 'confirmed'
+                try:
+                    order['order_number'] = get_order_store().place(order, st.session_state.session_id)
+                except sqlite3.Error as e:
+                    st.error(f"Could not save your order, please try again: {e}")
+                    return True
                 st.session_state.order_history.append(order)
                 
                 # Clear pending order
@@ -433,7 +1868,7 @@ def display_pending_order():
 {format_order_for_display(order)}
 
 Your order has been placed successfully! 
-Order #{len(st.session_state.order_history):04d}
+Order #{order['order_number']:04d}
 
 Thank you for dining with La Bella Italia! 🍝"""
                 st.session_state.messages.append({"role": "assistant", "content": confirmation_msg})
@@ -443,7 +1878,7 @@ Thank you for dining with La Bella Italia! 🍝"""
         with col2:
             if st.button("✏️ Modify Order", use_container_width=True):
                 st.session_state.awaiting_confirmation = False
-                st.session_state.messages.append({"role": "user", "content": "I'd like to modify my order"})
+                st.session_state.queued_prompt = "I'd like to modify my order"
                 st.rerun()
         
         with col3:
@@ -464,8 +1899,8 @@ def display_order_history():
         with st.sidebar:
             st.divider()
             st.subheader("📜 Order History")
-            for i, order in enumerate(reversed(st.session_state.order_history[-5:])):
-                with st.expander(f"Order #{len(st.session_state.order_history) - i:04d}"):
+            for order in reversed(st.session_state.order_history[-5:]):
+                with st.expander(f"Order #{order['order_number']:04d}"):
                     st.markdown(f"**Total:** ${order.get('total', 0):.2f}")
                     st.markdown(f"**Type:** {order.get('order_type', 'N/A')}")
                     st.markdown(f"**Time:** {order.get('confirmed_at', 'N/A')}")
@@ -498,6 +1933,14 @@ def display_menu_sidebar():
         with st.expander("Hours"):
             for day, hours in RESTAURANT_INFO['hours'].items():
                 st.text(f"{day}: {hours}")
+        
+        st.divider()
+        st.toggle("🧑‍🍳 Specialist team mode", key="team_mode",
+                  help="Ask the host, menu, order and recommendation specialists in parallel instead of one assistant")
+        
+        latencies = st.session_state.turn_latencies
+        if latencies:
+            st.caption(f"⏱️ Last reply: {latencies[-1]:.2f}s · average {sum(latencies) / len(latencies):.2f}s over {len(latencies)} turns")
 
 def main():
     """Main Streamlit application."""
@@ -525,6 +1968,8 @@ def main():
     # Display chat history
     chat_container = st.container()
     with chat_container:
+        if st.session_state.archived_messages:
+            st.caption(f"🗄️ {st.session_state.archived_messages} earlier messages archived; their key details are still remembered.")
         for message in st.session_state.messages:
             with st.chat_message(message["role"], avatar="🧑" if message["role"] == "user" else "👨‍🍳"):
                 st.markdown(message["content"])
@@ -534,20 +1979,28 @@ def main():
         st.warning("⚠️ Please confirm or cancel your pending order above before continuing.")
         st.chat_input("Please confirm your order first...", disabled=True)
     else:
-        if prompt := st.chat_input("How can I help you today? (e.g., 'Show me the menu', 'What do you recommend?', 'I'd like to place an order')"):
+        prompt = st.chat_input("How can I help you today? (e.g., 'Show me the menu', 'What do you recommend?', 'I'd like to place an order')")
+        # Quick action buttons queue their message for the next run
+        prompt = prompt or st.session_state.pop("queued_prompt", None)
+        if prompt:
             # Add user message
             st.session_state.messages.append({"role": "user", "content": prompt})
             with st.chat_message("user", avatar="🧑"):
                 st.markdown(prompt)
             
-            # Get AI response
+            # Get AI response, streamed into the chat bubble as it is generated
             with st.chat_message("assistant", avatar="👨‍🍳"):
-                with st.spinner("Thinking..."):
-                    response = asyncio.run(run_restaurant_chat(prompt))
-                    st.markdown(response)
+                placeholder = st.empty()
+                # Menu, hours, location, specials and dietary questions are answered from templates
+                response = answer_locally(prompt, order_pending=bool(st.session_state.pending_order))
+                if response is None:
+                    placeholder.markdown("*Thinking...*")
+                    response = submit_chat(prompt, on_text=lambda text: placeholder.markdown(text + " ▌"))
+                placeholder.markdown(response)
             
             # Add assistant response to history
             st.session_state.messages.append({"role": "assistant", "content": response})
+            trim_session_messages()
             
             # Rerun to show order confirmation if needed
             if st.session_state.awaiting_confirmation:
@@ -561,29 +2014,36 @@ def main():
     
     with col1:
         if st.button("📋 View Menu", use_container_width=True, disabled=disabled):
-            st.session_state.messages.append({"role": "user", "content": "Can you show me the full menu?"})
+            st.session_state.queued_prompt = "Can you show me the full menu?"
             st.rerun()
     
     with col2:
         if st.button("🌟 Get Recommendations", use_container_width=True, disabled=disabled):
-            st.session_state.messages.append({"role": "user", "content": "What dishes do you recommend?"})
+            st.session_state.queued_prompt = "What dishes do you recommend?"
             st.rerun()
     
     with col3:
         if st.button("🛒 Place Order", use_container_width=True, disabled=disabled):
-            st.session_state.messages.append({"role": "user", "content": "I'd like to place an order"})
+            st.session_state.queued_prompt = "I'd like to place an order"
             st.rerun()
     
     with col4:
         if st.button("ℹ️ Restaurant Info", use_container_width=True, disabled=disabled):
-            st.session_state.messages.append({"role": "user", "content": "Tell me about your restaurant hours and location"})
+            st.session_state.queued_prompt = "Tell me about your restaurant hours and location"
             st.rerun()
     
     # Clear chat button
     col1, col2 = st.columns([1, 4])
     with col1:
         if st.button("🗑️ Clear Chat"):
+            get_agent_cache().discard(st.session_state.session_id)
+            try:
+                archive_messages(st.session_state.session_id, st.session_state.messages)
+            except OSError as e:
+                print(f"Could not archive messages: {e}")
             st.session_state.messages = []
+            st.session_state.conversation_summary = ConversationSummary()
+            st.session_state.archived_messages = 0
             st.session_state.pending_order = None
             st.session_state.awaiting_confirmation = False
             st.rerun()
@@ -0,0 +1,223 @@
+"""
+Benchmark: Strategy Comparison over a Conversation Corpus
+
+Runs every selection and compression strategy in utils.strategies over a
+corpus of conversations (JSONL) in a process pool, and reports tokens saved,
+strategy CPU time and LLM calls per strategy.
+
+Corpus format, one conversation per line:
+    {"id": "...", "messages": [{"role": ..., "content": ...}, ...], "keywords": ["optional", ...]}
+
+When a conversation has no keywords, they are taken from its last user message.
+
+Usage:
+    python benchmarks/compare_strategies.py
+    python benchmarks/compare_strategies.py --corpus my_corpus.jsonl --backend api --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import (
+    print_header,
+    print_section,
+    print_info,
+    print_success,
+    estimate_tokens_for_messages,
+    create_chat_client
+)
+from utils.message_store import MessageStore, MessageView
+from utils.mock_client import MockChatClient
+from utils.strategies import STRATEGIES, apply_strategy, extract_keywords, summarize_with_client
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conversations.jsonl")
+
+# Per-process state, set up by _init_worker
+_worker = {}
+
+
+class _CountingCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        self._owner.calls += 1
+        return self._owner.client.chat.completions.create(**kwargs)
+
+
+class CountingClient:
+    """Wraps an OpenAI-style client and counts chat completion calls."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_CountingCompletions(self))
+
+
+def load_config():
+    """Load configuration from config.json."""
+    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print("Error: config.json not found.")
+        sys.exit(1)
+
+
+def load_corpus(path):
+    """Load conversations from a JSONL file."""
+    conversations = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            conversation = json.loads(line)
+            conversation.setdefault('id', f"line-{line_number}")
+            conversations.append(conversation)
+    return conversations
+
+
+def _init_worker(backend, config, model):
+    """Create the chat client used for compression in this worker process."""
+    if backend == "mock":
+        client = MockChatClient(base_latency=0.05, output_token_latency=0.0, jitter=0)
+    else:
+        client = create_chat_client(config, "benchmark_strategies")
+
+    _worker['client'] = CountingClient(client)
+    _worker['model'] = model
+
+
+def evaluate_conversation(conversation):
+    """
+    Apply every strategy to one conversation (runs in a worker process).
+
+    Returns:
+        List of per-strategy result dictionaries
+    """
+    client = _worker['client']
+    model = _worker['model']
+    summarize = summarize_with_client(client, model)
+
+    messages = conversation['messages']
+    keywords = conversation.get('keywords')
+    if not keywords:
+        user_messages = [m['content'] for m in messages if m.get('role') == 'user']
+        keywords = extract_keywords(user_messages[-1]) if user_messages else None
+
+    original_tokens = estimate_tokens_for_messages(messages, model)
+    # Strategies share this store: selections are views over it rather than copies
+    history = MessageStore.from_messages(messages, model).view()
+
+    results = []
+    for name in STRATEGIES:
+        calls_before = client.calls
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        reduced = apply_strategy(name, history, keywords=keywords, summarize=summarize)
+        cpu_seconds = time.process_time() - cpu_start
+        wall_seconds = time.perf_counter() - wall_start
+        if isinstance(reduced, MessageView):
+            tokens = reduced.token_count()
+        else:
+            tokens = estimate_tokens_for_messages(reduced, model)
+
+        results.append({
+            "conversation": conversation['id'],
+            "strategy": name,
+            "original_tokens": original_tokens,
+            "tokens": tokens,
+            "messages": len(reduced),
+            "cpu_seconds": cpu_seconds,
+            "wall_seconds": wall_seconds,
+            "llm_calls": client.calls - calls_before,
+        })
+    return results
+
+
+def run_comparison(conversations, backend, config, model, workers):
+    """Evaluate the corpus in a process pool and return all result rows."""
+    rows = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(backend, config, model),
+    ) as executor:
+        for results in executor.map(evaluate_conversation, conversations):
+            rows.extend(results)
+    return rows
+
+
+def print_report(rows):
+    """Print totals per strategy."""
+    totals = {}
+    for row in rows:
+        total = totals.setdefault(row['strategy'], {
+            "original_tokens": 0, "tokens": 0, "cpu_seconds": 0.0, "wall_seconds": 0.0, "llm_calls": 0,
+        })
+        for key in total:
+            total[key] += row[key]
+
+    print_section("Strategy Comparison")
+
+    print(f"{'Strategy':<22} {'Tokens':<12} {'Saved':<12} {'Saved %':<10} {'CPU (ms)':<10} {'Wall (s)':<10} {'LLM Calls':<10}")
+    print('─' * 90)
+
+    for name, total in totals.items():
+        saved = total['original_tokens'] - total['tokens']
+        saved_pct = saved / total['original_tokens'] * 100 if total['original_tokens'] else 0.0
+        print(f"{name:<22} {total['tokens']:<12,} {saved:<12,} {saved_pct:<10.1f} "
+              f"{total['cpu_seconds'] * 1000:<10.2f} {total['wall_seconds']:<10.2f} {total['llm_calls']:<10}")
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Compare context strategies over a conversation corpus")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL corpus of conversations")
+    parser.add_argument("--backend", choices=["mock", "api"], default="mock",
+                        help="Summarizer backend for compression strategies (api honours llm_mode)")
+    parser.add_argument("--model", default=None, help="Model for token counting and summaries")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", default=None, help="Optional JSONL file for per-conversation results")
+    return parser.parse_args()
+
+
+def main():
+    """Run the comparison."""
+    args = parse_args()
+    print_header("BENCHMARK: Strategy Comparison")
+
+    config = load_config() if args.backend == "api" else {}
+    model = args.model or config.get('model', 'gpt-3.5-turbo')
+
+    conversations = load_corpus(args.corpus)
+    print_info(f"Corpus: {len(conversations)} conversations from {args.corpus}")
+    print_info(f"Strategies: {', '.join(STRATEGIES)} | Backend: {args.backend} | Model: {model}")
+
+    start = time.perf_counter()
+    rows = run_comparison(conversations, args.backend, config, model, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print_report(rows)
+    print(f"\nTotal wall-clock: {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        print_success(f"Wrote {len(rows)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Benchmark: Latency vs. Context Size
+
+Replays conversations of increasing token size against a chat backend and
+measures how latency, time to first token and cost grow with the context.
+
+Backends:
+- mock: local MockChatClient with a configurable latency model (no API key)
+- api:  the client from config.json, honouring llm_mode (live/record/replay)
+
+Usage:
+    python benchmarks/latency_vs_context.py --backend mock
+    python benchmarks/latency_vs_context.py --backend api --models gpt-3.5-turbo --repeats 3
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import (
+    print_header,
+    print_section,
+    print_info,
+    print_success,
+    count_tokens,
+    estimate_tokens_for_messages,
+    estimate_cost,
+    get_context_window_size,
+    create_chat_client,
+    run_chat_completion,
+    CONTEXT_WINDOWS,
+    MODEL_PRICING
+)
+from utils.mock_client import MockChatClient
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+FILLER_TOPICS = [
+    "how Python lists grow and when to prefer a tuple",
+    "reading files line by line with a context manager",
+    "sorting records by several keys with sorted() and a key function",
+    "why dictionaries keep insertion order since Python 3.7",
+    "writing list comprehensions that stay readable",
+]
+
+
+def load_config():
+    """Load configuration from config.json."""
+    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print("Error: config.json not found.")
+        sys.exit(1)
+
+
+def build_conversation(target_tokens, model):
+    """
+    Build a conversation whose estimated size is close to target_tokens.
+
+    Filler turns are added one at a time using their individual token counts,
+    then the final size is measured with estimate_tokens_for_messages.
+
+    Args:
+        target_tokens: Desired prompt size in tokens
+        model: Model name used for token counting
+
+    Returns:
+        Tuple of (messages, actual token count)
+    """
+    messages = [{"role": "system", "content": "You are a concise Python tutor."}]
+    question = {"role": "user", "content": "Summarize what we discussed in one sentence."}
+
+    total = estimate_tokens_for_messages(messages + [question], model)
+    turn = 0
+    while True:
+        topic = FILLER_TOPICS[turn % len(FILLER_TOPICS)]
+        role = "user" if turn % 2 == 0 else "assistant"
+        content = (
+            f"Turn {turn}: Let's talk about {topic}. "
+            f"This is part of a long tutoring session, and the details of {topic} matter later."
+        )
+        message_tokens = 3 + count_tokens(role, model) + count_tokens(content, model)
+        if total + message_tokens > target_tokens:
+            break
+        messages.append({"role": role, "content": content})
+        total += message_tokens
+        turn += 1
+
+    messages.append(question)
+    return messages, estimate_tokens_for_messages(messages, model)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def default_sizes(model, max_tokens, largest=None):
+    """Powers of two from 256 up to what fits in the model's context window."""
+    limit = get_context_window_size(model) - max_tokens
+    if largest:
+        limit = min(limit, largest)
+    sizes = []
+    size = 256
+    while size <= limit:
+        sizes.append(size)
+        size *= 2
+    return sizes
+
+
+def run_benchmark(client, sizes_by_model, repeats, max_tokens, stream):
+    """
+    Run every (model, size) combination and collect one row per call.
+
+    Args:
+        client: OpenAI-style client
+        sizes_by_model: Dictionary mapping model name to target prompt sizes
+        repeats: Calls per size
+        max_tokens: max_tokens per call
+        stream: Whether to stream responses (needed for a real TTFT)
+
+    Returns:
+        List of result dictionaries
+    """
+    rows = []
+    for model, sizes in sizes_by_model.items():
+        print_section(f"Model: {model} (window: {get_context_window_size(model):,} tokens)")
+
+        for target in sizes:
+            if target + max_tokens > get_context_window_size(model):
+                print_info(f"Skipping {target:,} tokens: does not fit in {model}'s window")
+                continue
+
+            messages, prompt_tokens = build_conversation(target, model)
+            for repeat in range(repeats):
+                _, stats = run_chat_completion(
+                    client,
+                    model,
+                    messages,
+                    stream=stream,
+                    on_text=None,
+                    temperature=0,
+                    max_tokens=max_tokens
+                )
+                rows.append({
+                    "model": model,
+                    "target_tokens": target,
+                    "prompt_tokens": prompt_tokens,
+                    "repeat": repeat,
+                    "ttft": stats['ttft'],
+                    "latency": stats['total'],
+                    "completion_tokens": stats['completion_tokens'],
+                    "cost": estimate_cost(prompt_tokens, stats['completion_tokens'], model),
+                })
+
+            latest = [r['latency'] for r in rows[-repeats:]]
+            print(f"  {prompt_tokens:>8,} tokens: p50 {percentile(latest, 50):.3f}s")
+
+    return rows
+
+
+def summarize(rows):
+    """Group rows by (model, size) and compute latency percentiles and cost."""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['model'], row['target_tokens']), []).append(row)
+
+    summary = []
+    for (model, target), group in groups.items():
+        latencies = [r['latency'] for r in group]
+        ttfts = [r['ttft'] for r in group]
+        costs = [r['cost'] for r in group]
+        summary.append({
+            "model": model,
+            "target_tokens": target,
+            "prompt_tokens": group[0]['prompt_tokens'],
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "ttft_p50": percentile(ttfts, 50),
+            "cost": None if None in costs else sum(costs) / len(costs),
+        })
+    return summary
+
+
+def print_summary(summary):
+    """Print the latency curve for each model."""
+    print_section("Latency vs. Context Size")
+
+    print(f"{'Model':<22} {'Prompt Tokens':<15} {'p50 (s)':<10} {'p95 (s)':<10} {'TTFT p50':<10} {'Cost/call':<10}")
+    print('─' * 80)
+
+    for row in summary:
+        cost = "n/a" if row['cost'] is None else f"${row['cost']:.5f}"
+        print(f"{row['model']:<22} {row['prompt_tokens']:<15,} {row['p50']:<10.3f} {row['p95']:<10.3f} "
+              f"{row['ttft_p50']:<10.3f} {cost:<10}")
+
+
+def write_csv(rows, path):
+    """Write one CSV row per call."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Measure latency against context size")
+    parser.add_argument("--backend", choices=["mock", "api"], default="mock",
+                        help="mock: local latency model; api: client from config.json (honours llm_mode)")
+    parser.add_argument("--models", nargs="+", default=None,
+                        help="Models to benchmark (default: every model in the context window table for mock, "
+                             "the config model for api)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=None,
+                        help="Target prompt sizes in tokens (default: powers of two that fit the window)")
+    parser.add_argument("--max-size", type=int, default=16384,
+                        help="Largest default size, to keep runs short (default: 16384)")
+    parser.add_argument("--repeats", type=int, default=5, help="Calls per size (default: 5)")
+    parser.add_argument("--max-tokens", type=int, default=50, help="max_tokens per call (default: 50)")
+    parser.add_argument("--no-stream", action="store_true", help="Disable streaming (TTFT equals total latency)")
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_DIR, "latency_vs_context.csv"),
+                        help="CSV output path (default: benchmarks/latency_vs_context.csv)")
+
+    mock = parser.add_argument_group("mock backend")
+    mock.add_argument("--base-latency", type=float, default=0.2, help="Fixed latency per call in seconds")
+    mock.add_argument("--prompt-token-latency", type=float, default=0.00002,
+                      help="Extra seconds to first token per prompt token")
+    mock.add_argument("--output-token-latency", type=float, default=0.01, help="Seconds per output token")
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    print_header("BENCHMARK: Latency vs. Context Size")
+
+    if args.backend == "mock":
+        client = MockChatClient(
+            base_latency=args.base_latency,
+            prompt_token_latency=args.prompt_token_latency,
+            output_token_latency=args.output_token_latency,
+        )
+        models = args.models or list(CONTEXT_WINDOWS)
+    else:
+        config = load_config()
+        client = create_chat_client(config, "benchmark_latency")
+        models = args.models or [config.get('model', 'gpt-3.5-turbo')]
+
+    sizes_by_model = {
+        model: args.sizes or default_sizes(model, args.max_tokens, args.max_size)
+        for model in models
+    }
+
+    print_info(f"Backend: {args.backend} | Models: {', '.join(models)} | Repeats: {args.repeats}")
+    for model in models:
+        if model not in CONTEXT_WINDOWS:
+            print_info(f"{model} is not in the context window table: assuming "
+                       f"{get_context_window_size(model):,} tokens")
+        if model not in MODEL_PRICING:
+            print_info(f"{model} has no price in MODEL_PRICING: cost is reported as n/a")
+
+    rows = run_benchmark(client, sizes_by_model, args.repeats, args.max_tokens, not args.no_stream)
+
+    if not rows:
+        print_info("Nothing to benchmark")
+        return
+
+    print_summary(summarize(rows))
+    write_csv(rows, args.output)
+    print_success(f"Wrote {len(rows)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
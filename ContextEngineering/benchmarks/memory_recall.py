@@ -0,0 +1,133 @@
+"""
+Benchmark: Long-Term Memory Recall Latency
+
+Fills a SQLite FTS5 MemoryStore with synthetic conversation turns (1M by
+default) and measures recall() latency for queries that match many, few or
+no stored messages.
+
+Usage:
+    python benchmarks/memory_recall.py
+    python benchmarks/memory_recall.py --messages 100000 --queries 500
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import print_header, print_section, print_info, print_success
+from utils.memory_store import MemoryStore
+
+
+TOPICS = [
+    "list", "dictionary", "generator", "decorator", "pathlib", "asyncio", "dataclass", "regex",
+    "logging", "pytest", "sqlite", "pandas", "numpy", "typing", "context manager", "threading",
+]
+# A long tail of rare identifiers, so some queries match only a handful of rows
+RARE_WORDS = [f"symbol{i}" for i in range(20000)]
+
+QUERIES = {
+    "common": ["How do I use a list comprehension?", "Show me the dictionary example again"],
+    "mixed": ["What did we say about asyncio and symbol1234?", "Explain the pytest fixture for symbol42"],
+    "rare": ["Where did symbol19999 come from?", "What was symbol777 used for?"],
+    "no match": ["Tell me about kubernetes helm charts"],
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def generate_messages(count, seed=0):
+    """Yield synthetic user/assistant messages about Python topics."""
+    rng = random.Random(seed)
+    for i in range(count):
+        topic = TOPICS[min(int(rng.expovariate(0.3)), len(TOPICS) - 1)]
+        rare = rng.choice(RARE_WORDS)
+        if i % 2 == 0:
+            yield {"role": "user", "content": f"How do I use a {topic} together with {rare} in turn {i}?"}
+        else:
+            yield {"role": "assistant", "content": f"For {topic}, wrap {rare} in a helper function and test it (turn {i})."}
+
+
+def fill_store(store, count, batch_size):
+    """Write count messages in batches and return the elapsed seconds."""
+    start = time.perf_counter()
+    batch = []
+    for message in generate_messages(count):
+        batch.append(message)
+        if len(batch) == batch_size:
+            store.write_messages(batch)
+            batch = []
+            print(f"\r  {store.count():,} / {count:,} messages", end="", flush=True)
+    if batch:
+        store.write_messages(batch)
+    print()
+    return time.perf_counter() - start
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Recall latency of the FTS5 memory store")
+    parser.add_argument("--messages", type=int, default=1_000_000, help="Stored messages (default: 1M)")
+    parser.add_argument("--queries", type=int, default=200, help="Recalls per query type (default: 200)")
+    parser.add_argument("--token-budget", type=int, default=500, help="Token budget per recall (default: 500)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Messages per write transaction")
+    parser.add_argument("--db", default=None, help="Database path (default: a temporary file)")
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    print_header("BENCHMARK: Memory Recall Latency")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "memory.db")
+        store = MemoryStore(path)
+
+        print_section("Writing Memories")
+        if store.count() < args.messages:
+            elapsed = fill_store(store, args.messages - store.count(), args.batch_size)
+            print_info(f"Wrote {args.messages:,} messages in {elapsed:.1f}s "
+                       f"({args.messages / elapsed:,.0f} messages/s)")
+            start = time.perf_counter()
+            store.optimize()
+            print_info(f"Merged index segments in {time.perf_counter() - start:.1f}s")
+        print_info(f"Database: {os.path.getsize(path) / (1024 * 1024):,.1f} MB")
+
+        print_section("Recall Latency")
+        print(f"{'Query Type':<12} {'p50 (ms)':<10} {'p95 (ms)':<10} {'p99 (ms)':<10} {'Recalled':<10} {'Tokens':<10}")
+        print('─' * 65)
+
+        for label, queries in QUERIES.items():
+            latencies = []
+            recalled = []
+            for i in range(args.queries):
+                start = time.perf_counter()
+                memories = store.recall(queries[i % len(queries)], token_budget=args.token_budget)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalled.append(memories)
+
+            count = sum(len(m) for m in recalled) / len(recalled)
+            tokens = sum(sum(x['tokens'] for x in m) for m in recalled) / len(recalled)
+            print(f"{label:<12} {percentile(latencies, 50):<10.2f} {percentile(latencies, 95):<10.2f} "
+                  f"{percentile(latencies, 99):<10.2f} {count:<10.1f} {tokens:<10.0f}")
+
+        store.close()
+        print_success("Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark: Message Store Memory and Strategy Cost
+
+Compares a conversation kept as a list of message dictionaries with the
+column-oriented MessageStore, at 1M messages by default:
+- memory to hold the history
+- memory and time to build the recent / keyword / minimal contexts
+  (list copies vs. views that share storage)
+
+Token counts are computed once per distinct message text, so the benchmark
+measures storage rather than tokenizer speed.
+
+Usage:
+    python benchmarks/message_store_memory.py
+    python benchmarks/message_store_memory.py --messages 200000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import print_header, print_section, print_info, count_tokens
+from utils.message_store import MessageStore, select_relevant_view
+from utils.strategies import select_relevant_messages
+
+
+TEMPLATES = [
+    ("user", "How do I sort a Python list by a key function? (question {i})"),
+    ("assistant", "Use sorted(items, key=lambda item: item.score) or items.sort(key=...). (answer {i})"),
+    ("user", "How do I read a file line by line? (question {i})"),
+    ("assistant", "Iterate over the file object: for line in open('data.txt'): ... (answer {i})"),
+]
+
+
+def generate_messages(count):
+    """Yield (role, content, tokens) for a synthetic conversation."""
+    yield "system", "You are a helpful programming assistant.", None
+    token_cache = {}
+    for i in range(count - 1):
+        role, template = TEMPLATES[i % len(TEMPLATES)]
+        content = template.format(i=i)
+        # Every message has unique text, but the numbered suffix keeps token counts per template stable
+        key = (role, template, len(str(i)))
+        if key not in token_cache:
+            token_cache[key] = count_tokens(role) + count_tokens(content)
+        yield role, content, token_cache[key]
+
+
+def measure(label, build):
+    """
+    Time build(), then run it again under tracemalloc to measure memory.
+
+    Timing and memory are measured in separate runs because tracing every
+    allocation slows Python code down by an order of magnitude.
+
+    Returns:
+        The result of the traced run
+    """
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    megabytes = current / (1024 * 1024)
+    print(f"{label:<45} {megabytes:>10.2f} MB {elapsed:>10.4f} s")
+    return result, megabytes, elapsed
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Memory benchmark for MessageStore")
+    parser.add_argument("--messages", type=int, default=1_000_000, help="Conversation length (default: 1M)")
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    print_header("BENCHMARK: Message Store Memory")
+    print_info(f"Messages: {args.messages:,}")
+
+    # Contents are shared by both representations, so build them once outside the measurements
+    generated = list(generate_messages(args.messages))
+    keywords = ["sort"]
+
+    print_section("Holding the History")
+    print(f"{'Representation':<45} {'Memory':>13} {'Time':>12}")
+    print('─' * 80)
+
+    dicts, dict_mb, _ = measure("list of dicts", lambda: [
+        {"role": role, "content": content} for role, content, _ in generated
+    ])
+
+    def build_store():
+        store = MessageStore()
+        for role, content, tokens in generated:
+            store.append(role, content, tokens)
+        return store
+
+    store, store_mb, _ = measure("MessageStore (array columns)", build_store)
+    print(f"\nMessageStore uses {store_mb / dict_mb * 100:.1f}% of the list-of-dicts memory "
+          f"(contents shared, excluded from both)")
+
+    print_section("Building Strategy Contexts")
+    print(f"{'Strategy':<45} {'Memory':>13} {'Time':>12}")
+    print('─' * 80)
+
+    measure("recent (list copy)", lambda: select_relevant_messages(dicts, max_messages=4))
+    view = store.view()
+    measure("recent (view)", lambda: select_relevant_view(view, max_messages=4))
+
+    measure("keyword (list copy)", lambda: select_relevant_messages(dicts, keywords=keywords, max_messages=6))
+    measure("keyword (view)", lambda: select_relevant_view(view, keywords=keywords, max_messages=6))
+
+    measure("history without system (list slice)", lambda: dicts[1:])
+    measure("history without system (view slice)", lambda: view[1:])
+
+    print_section("Token Counting")
+    measure("token_count() from cached counts", lambda: view.token_count())
+
+
+if __name__ == "__main__":
+    main()
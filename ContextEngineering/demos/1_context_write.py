@@ -6,6 +6,7 @@ This demo shows:
 - Real-time token counting
 - Context window usage visualization
 - Impact of conversation length on token consumption
+- Writing old turns to an external memory and recalling only what is relevant
 """
 
 import json
@@ -21,10 +22,15 @@ from utils import (
     print_section,
     visualize_tokens,
     print_messages,
+    print_comparison,
+    print_info,
     count_tokens,
     estimate_tokens_for_messages,
-    get_context_window_size
+    get_context_window_size,
+    Cassette,
+    attach_cassette
 )
+from utils.memory_store import MemoryStore, memories_to_message
 
 
 def load_config():
@@ -77,6 +83,7 @@ def demo_context_write():
         llm_config=llm_config,
         human_input_mode="NEVER",
     )
+    attach_cassette(assistant, Cassette.from_config(config, "demo1_context_write"))
 
     print("✓ User agent created")
     print("✓ Assistant agent created")
@@ -150,12 +157,38 @@ def demo_context_write():
     print("\n")
     visualize_tokens(token_history[-1]['tokens'], context_window, "Final Context Usage")
 
+    # Move old turns out of the prompt into long-term memory
+    print_section("Writing Old Turns to External Memory")
+
+    chat_history = assistant.chat_messages[user]
+    system_message = {"role": "system", "content": assistant.system_message}
+    follow_up = {"role": "user", "content": "Remind me how extend() differs from append()."}
+    recent_turns = chat_history[-2:]
+
+    memory = MemoryStore(model=model)
+    memory.write_messages(chat_history[:-2])
+    recalled = memory.recall(follow_up['content'], token_budget=config.get('memory_token_budget', 200))
+    print_info(f"Stored {memory.count()} older messages; recalled {len(recalled)} for the follow-up question")
+
+    full_prompt = [system_message] + chat_history + [follow_up]
+    memory_prompt = [system_message] + recent_turns + [follow_up]
+    if recalled:
+        memory_prompt.insert(1, memories_to_message(recalled))
+        print_messages(memory_prompt, "Prompt with Recalled Memories", model)
+
+    print_comparison(
+        {"tokens": estimate_tokens_for_messages(full_prompt, model), "messages": len(full_prompt)},
+        {"tokens": estimate_tokens_for_messages(memory_prompt, model), "messages": len(memory_prompt)}
+    )
+    memory.close()
+
     # Key insights
     print_section("Key Insights")
     print("✓ Context grows linearly with each user-assistant exchange")
     print("✓ Each message adds ~3-4 tokens for formatting overhead")
     print("✓ Longer responses consume more tokens")
     print("✓ Context accumulates - old messages remain unless managed")
+    print("✓ External memory lets old turns leave the prompt and return only when relevant")
     print(f"✓ After {len(questions)} turns: {token_history[-1]['tokens']:,} tokens used")
     print(f"✓ Remaining capacity: {context_window - token_history[-1]['tokens']:,} tokens")
 
@@ -163,6 +196,11 @@ def demo_context_write():
     print_section("Complete Conversation History")
     print_messages(assistant.chat_messages[user], "All Messages", model)
 
+    return {
+        "original_tokens": token_history[0]['tokens'],
+        "final_tokens": token_history[-1]['tokens'],
+    }
+
 
 if __name__ == "__main__":
     demo_context_write()
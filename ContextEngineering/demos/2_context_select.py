@@ -21,11 +21,12 @@ from utils import (
     print_section,
     visualize_tokens,
     print_comparison,
-    estimate_tokens_for_messages,
     get_context_window_size,
     print_info,
     print_success
 )
+from utils.message_store import MessageStore
+from utils.strategies import select_relevant_messages
 
 
 def load_config():
@@ -39,49 +40,6 @@ def load_config():
         sys.exit(1)
 
 
-def select_relevant_messages(messages, keywords=None, max_messages=5, keep_system=True):
-    """
-    Select relevant messages from conversation history.
-
-    Args:
-        messages: List of message dictionaries
-        keywords: List of keywords to match (if None, use recency)
-        max_messages: Maximum number of messages to keep
-        keep_system: Whether to always keep system messages
-
-    Returns:
-        Filtered list of messages
-    """
-    selected = []
-
-    # Always keep system message if requested
-    if keep_system:
-        system_msgs = [m for m in messages if m.get('role') == 'system']
-        selected.extend(system_msgs)
-
-    # Get non-system messages
-    other_msgs = [m for m in messages if m.get('role') != 'system']
-
-    if keywords:
-        # Select messages containing keywords
-        relevant = []
-        for msg in other_msgs:
-            content = msg.get('content', '').lower()
-            if any(keyword.lower() in content for keyword in keywords):
-                relevant.append(msg)
-
-        # If we found relevant messages, use them; otherwise fall back to recent
-        if relevant:
-            selected.extend(relevant[-max_messages:])
-        else:
-            selected.extend(other_msgs[-max_messages:])
-    else:
-        # Just take the most recent messages
-        selected.extend(other_msgs[-max_messages:])
-
-    return selected
-
-
 def demo_context_select():
     """Demonstrate selective context passing."""
     print_header("DEMO 2: Context SELECT - Selective Message Passing")
@@ -119,8 +77,11 @@ def demo_context_select():
         {"role": "assistant", "content": "List comprehensions provide a concise way to create lists: [x*2 for x in range(10)] creates [0,2,4,6,8,10,12,14,16,18]"},
     ]
 
+    # Every strategy below selects a view over this store instead of copying the history
+    history = MessageStore.from_messages(conversation_history, model).view()
+
     # Calculate original token count
-    original_tokens = estimate_tokens_for_messages(conversation_history, model)
+    original_tokens = history.token_count()
 
     print_info(f"Original conversation: {len(conversation_history)} messages")
     visualize_tokens(original_tokens, context_window, "Original Context")
@@ -129,12 +90,12 @@ def demo_context_select():
     print_section("Strategy 1: Keep Only Recent Messages")
 
     recent_messages = select_relevant_messages(
-        conversation_history,
+        history,
         max_messages=4,  # Keep last 4 non-system messages
         keep_system=True
     )
 
-    recent_tokens = estimate_tokens_for_messages(recent_messages, model)
+    recent_tokens = recent_messages.token_count()
 
     print(f"Selected messages: {len(recent_messages)}")
     print("\nSelected conversation:")
@@ -158,13 +119,13 @@ def demo_context_select():
     print_info("User's next question will be about 'lists', selecting relevant messages...")
 
     keyword_messages = select_relevant_messages(
-        conversation_history,
+        history,
         keywords=["list", "sort", "reverse"],
         max_messages=6,
         keep_system=True
     )
 
-    keyword_tokens = estimate_tokens_for_messages(keyword_messages, model)
+    keyword_tokens = keyword_messages.token_count()
 
     print(f"\nSelected messages: {len(keyword_messages)}")
     print("\nSelected conversation (list-related):")
@@ -184,10 +145,9 @@ def demo_context_select():
     # Scenario 3: Minimal context (system + last exchange only)
     print_section("Strategy 3: Minimal Context (System + Last Exchange)")
 
-    minimal_messages = [conversation_history[0]]  # System message
-    minimal_messages.extend(conversation_history[-2:])  # Last user-assistant exchange
+    minimal_messages = history[:1] + history[-2:]  # System message + last user-assistant exchange
 
-    minimal_tokens = estimate_tokens_for_messages(minimal_messages, model)
+    minimal_tokens = minimal_messages.token_count()
 
     print(f"Selected messages: {len(minimal_messages)}")
     print("\nMinimal conversation:")
@@ -238,6 +198,11 @@ def demo_context_select():
     print("5. Monitor response quality when reducing context")
     print("6. Combine strategies: recent + keyword-matching")
 
+    return {
+        "original_tokens": original_tokens,
+        "final_tokens": min(recent_tokens, keyword_tokens, minimal_tokens),
+    }
+
 
 if __name__ == "__main__":
     demo_context_select()
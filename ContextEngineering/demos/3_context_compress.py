@@ -25,8 +25,11 @@ from utils import (
     get_context_window_size,
     print_info,
     print_success,
-    count_tokens
+    count_tokens,
+    Cassette,
+    attach_cassette
 )
+from utils.conversation import Conversation
 
 
 def load_config():
@@ -40,7 +43,7 @@ def load_config():
         sys.exit(1)
 
 
-def create_conversation_summary(messages, llm_config, model):
+def create_conversation_summary(messages, llm_config, model, cassette=None):
     """
     Create a summary of conversation messages using an LLM.
 
@@ -48,6 +51,7 @@ def create_conversation_summary(messages, llm_config, model):
         messages: List of message dictionaries to summarize
         llm_config: LLM configuration
         model: Model name
+        cassette: Optional cassette to record/replay the summarizer's replies
 
     Returns:
         Summary message dictionary
@@ -59,6 +63,8 @@ def create_conversation_summary(messages, llm_config, model):
         llm_config=llm_config,
         human_input_mode="NEVER",
     )
+    if cassette is not None:
+        attach_cassette(summarizer, cassette)
 
     # Format messages for summarization
     conversation_text = "\n".join([
@@ -112,6 +118,7 @@ def demo_context_compress():
         }],
         "temperature": config.get('temperature', 0.7),
     }
+    cassette = Cassette.from_config(config, "demo3_context_compress")
 
     # Create a long conversation history
     conversation_history = [
@@ -134,6 +141,9 @@ def demo_context_compress():
     original_tokens = estimate_tokens_for_messages(conversation_history, model)
     original_message_count = len(conversation_history)
 
+    # Each compressed context is a branch of the system prompt, so they share it instead of copying
+    base = Conversation.from_messages(conversation_history[:1], model)
+
     print_info(f"Original conversation: {original_message_count} messages")
     print_info(f"Total tokens: {original_tokens:,}")
     print("\n")
@@ -160,16 +170,16 @@ def demo_context_compress():
     print(f"\nCreating summary of {len(messages_to_compress)} messages...")
 
     # Create summary
-    summary_message = create_conversation_summary(messages_to_compress, llm_config, model)
+    summary_message = create_conversation_summary(messages_to_compress, llm_config, model, cassette)
 
     print_success("Summary created!")
     print(f"\nSummary ({count_tokens(summary_message['content'], model)} tokens):")
     print(f"{summary_message['content']}\n")
 
     # Build compressed context
-    compressed_history_1 = [conversation_history[0], summary_message] + recent_messages
+    compressed_history_1 = base.branch().append(summary_message).extend(recent_messages)
 
-    compressed_tokens_1 = estimate_tokens_for_messages(compressed_history_1, model)
+    compressed_tokens_1 = compressed_history_1.token_count()
 
     visualize_tokens(compressed_tokens_1, context_window, "Compressed Context (Strategy 1)")
 
@@ -190,16 +200,16 @@ def demo_context_compress():
     print(f"\nCreating summary of {len(messages_to_compress_2)} messages...")
 
     # Create summary
-    summary_message_2 = create_conversation_summary(messages_to_compress_2, llm_config, model)
+    summary_message_2 = create_conversation_summary(messages_to_compress_2, llm_config, model, cassette)
 
     print_success("Aggressive summary created!")
     print(f"\nSummary ({count_tokens(summary_message_2['content'], model)} tokens):")
     print(f"{summary_message_2['content']}\n")
 
     # Build aggressively compressed context
-    compressed_history_2 = [conversation_history[0], summary_message_2] + last_messages
+    compressed_history_2 = base.branch().append(summary_message_2).extend(last_messages)
 
-    compressed_tokens_2 = estimate_tokens_for_messages(compressed_history_2, model)
+    compressed_tokens_2 = compressed_history_2.token_count()
 
     visualize_tokens(compressed_tokens_2, context_window, "Compressed Context (Strategy 2)")
 
@@ -208,6 +218,10 @@ def demo_context_compress():
         {"messages": len(compressed_history_2), "tokens": compressed_tokens_2}
     )
 
+    shared, only_1, only_2 = compressed_history_1.diff(compressed_history_2)
+    print_info(f"Both contexts share their first {shared} message(s); "
+               f"they differ in {len(only_1)} vs. {len(only_2)} messages")
+
     # Strategy comparison
     print_section("Compression Strategy Comparison")
 
@@ -253,6 +267,11 @@ def demo_context_compress():
     print("✗ Don't compress if details are critical")
     print("✗ Don't compress very recent messages")
 
+    return {
+        "original_tokens": original_tokens,
+        "final_tokens": min(compressed_tokens_1, compressed_tokens_2),
+    }
+
 
 if __name__ == "__main__":
     demo_context_compress()
@@ -11,6 +11,8 @@ This demo shows:
 import json
 import sys
 import os
+import time
+import asyncio
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -25,7 +27,9 @@ from utils import (
     print_info,
     print_success,
     print_warning,
-    count_tokens
+    count_tokens,
+    Cassette,
+    attach_cassette
 )
 from colorama import Fore, Style
 
@@ -41,6 +45,65 @@ def load_config():
         sys.exit(1)
 
 
+def create_isolated_pair(name, system_message, llm_config, cassette):
+    """
+    Create a user/assistant agent pair with its own conversation context.
+
+    Args:
+        name: Prefix for the agent names
+        system_message: System message for the assistant
+        llm_config: LLM configuration
+        cassette: Cassette to record/replay the assistant's replies
+
+    Returns:
+        Tuple of (user agent, assistant agent)
+    """
+    assistant = ConversableAgent(
+        name=f"{name}Assistant",
+        system_message=system_message,
+        llm_config=llm_config,
+        human_input_mode="NEVER",
+    )
+    attach_cassette(assistant, cassette)
+
+    user = ConversableAgent(
+        name=f"{name}User",
+        llm_config=False,
+        human_input_mode="NEVER",
+    )
+
+    return user, assistant
+
+
+async def run_isolated_conversations(conversations, max_concurrency=2):
+    """
+    Run independent conversations concurrently.
+
+    Each conversation keeps its turns in order, but different conversations
+    run at the same time, up to max_concurrency at once. AutoGen's send() is
+    blocking, so each conversation runs in a worker thread.
+
+    Args:
+        conversations: List of (user, assistant, questions) tuples
+        max_concurrency: Maximum number of conversations running at once
+
+    Returns:
+        List of chat histories, in the same order as conversations
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run_conversation(user, assistant, questions):
+        async with semaphore:
+            for question in questions:
+                await asyncio.to_thread(user.send, message=question, recipient=assistant, request_reply=True)
+        return assistant.chat_messages[user]
+
+    return await asyncio.gather(*(
+        run_conversation(user, assistant, questions)
+        for user, assistant, questions in conversations
+    ))
+
+
 def demo_context_isolate():
     """Demonstrate context isolation."""
     print_header("DEMO 4: Context ISOLATE - Maintaining Separate Contexts")
@@ -60,6 +123,7 @@ def demo_context_isolate():
         }],
         "temperature": config.get('temperature', 0.7),
     }
+    cassette = Cassette.from_config(config, "demo4_context_isolate")
 
     # === Scenario 1: WITHOUT Isolation (Context Leakage) ===
     print_section("WITHOUT Isolation: Context Leakage Problem")
@@ -73,6 +137,7 @@ def demo_context_isolate():
         llm_config=llm_config,
         human_input_mode="NEVER",
     )
+    attach_cassette(shared_assistant, cassette)
 
     shared_user = ConversableAgent(
         name="SharedUser",
@@ -132,6 +197,7 @@ def demo_context_isolate():
         llm_config=llm_config,
         human_input_mode="NEVER",
     )
+    attach_cassette(python_assistant, cassette)
 
     python_user = ConversableAgent(
         name="PythonUser",
@@ -146,6 +212,7 @@ def demo_context_isolate():
         llm_config=llm_config,
         human_input_mode="NEVER",
     )
+    attach_cassette(cooking_assistant, cassette)
 
     cooking_user = ConversableAgent(
         name="CookingUser",
@@ -153,6 +220,8 @@ def demo_context_isolate():
         human_input_mode="NEVER",
     )
 
+    sequential_start = time.perf_counter()
+
     # Task 1: Python (isolated context)
     print(f"\n{Fore.GREEN}Isolated Context 1: Python Programming{Style.RESET_ALL}")
     print("─" * 40)
@@ -185,6 +254,7 @@ def demo_context_isolate():
     print(f"Python Assistant: {iso_response3[:150]}...\n")
 
     python_tokens_final = estimate_tokens_for_messages(python_assistant.chat_messages[python_user], model)
+    sequential_seconds = time.perf_counter() - sequential_start
 
     print_success("SOLUTION: 'Show me an example' is clear in Python context!")
     print_success("Each context maintains only relevant information")
@@ -194,6 +264,44 @@ def demo_context_isolate():
     visualize_tokens(python_tokens_final, context_window, "Python Context (Isolated)")
     visualize_tokens(cooking_tokens, context_window, "Cooking Context (Isolated)")
 
+    # === Scenario 3: Isolated contexts run concurrently ===
+    print_section("Isolation + Parallelism: Running Independent Contexts Concurrently")
+
+    max_concurrency = config.get('isolation_concurrency', 2)
+    print_info(f"Isolated contexts share nothing, so they can run at the same time (limit: {max_concurrency})...")
+
+    parallel_python = create_isolated_pair(
+        "ParallelPython",
+        "You are a Python programming expert. Only discuss Python topics.",
+        llm_config,
+        cassette,
+    )
+    parallel_cooking = create_isolated_pair(
+        "ParallelCooking",
+        "You are a cooking expert. Only discuss cooking and recipes.",
+        llm_config,
+        cassette,
+    )
+
+    parallel_start = time.perf_counter()
+    parallel_histories = asyncio.run(run_isolated_conversations([
+        (*parallel_python, [question1, question3]),
+        (*parallel_cooking, [question2]),
+    ], max_concurrency))
+    parallel_seconds = time.perf_counter() - parallel_start
+
+    for label, history in zip(["Python", "Cooking"], parallel_histories):
+        tokens = estimate_tokens_for_messages(history, model)
+        print(f"{label} context: {len(history)} messages, {tokens:,} tokens")
+
+    print(f"\n{'Execution':<25} {'Wall-clock':<15}")
+    print('─' * 40)
+    print(f"{'Sequential':<25} {sequential_seconds:<15.2f}")
+    print(f"{'Concurrent':<25} {parallel_seconds:<15.2f}")
+
+    if parallel_seconds > 0:
+        print_success(f"Concurrent isolated contexts finished {sequential_seconds / parallel_seconds:.1f}x faster")
+
     # Comparison
     print_section("Isolation Benefits Comparison")
 
@@ -293,6 +401,13 @@ def get_agent_for_session(session_id):
 
     print(code_example)
 
+    return {
+        "original_tokens": shared_tokens,
+        "final_tokens": python_tokens_final + cooking_tokens,
+        "sequential_seconds": sequential_seconds,
+        "concurrent_seconds": parallel_seconds,
+    }
+
 
 if __name__ == "__main__":
     demo_context_isolate()
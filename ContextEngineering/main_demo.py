@@ -1,18 +1,26 @@
 """
 Main Demo Runner for Context Engineering
 
-Runs all context engineering demonstrations in sequence with a visual menu.
+Runs all context engineering demonstrations in sequence with a visual menu,
+or all at once in parallel worker processes with --batch.
 """
 
 import sys
 import os
+import io
 import json
+import time
+import argparse
+import contextlib
+import importlib.util
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from colorama import Fore, Style, init
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils import print_header, print_section, print_success, print_info, print_error
+from utils import print_header, print_section, print_success, print_info, print_error, get_llm_mode
 
 # Initialize colorama
 init(autoreset=True)
@@ -35,12 +43,13 @@ def check_config():
         with open(config_path, 'r', encoding='utf-8') as f:
             config = json.load(f)
 
-        if config.get('api_key') == 'your-openai-api-key-here':
+        if get_llm_mode(config) != "replay" and config.get('api_key') == 'your-openai-api-key-here':
             print_error("Please update your API key in config.json")
             return False
 
         print_success("Configuration loaded successfully")
         print_info(f"Model: {config.get('model', 'gpt-3.5-turbo')}")
+        print_info(f"LLM mode: {get_llm_mode(config)}")
         return True
 
     except Exception as e:
@@ -85,37 +94,161 @@ def print_menu():
     print(f"{Fore.CYAN}[0]{Style.RESET_ALL} Exit\n")
 
 
-def run_demo(demo_number):
-    """Run a specific demo."""
-    demos = {
-        1: "demos/1_context_write.py",
-        2: "demos/2_context_select.py",
-        3: "demos/3_context_compress.py",
-        4: "demos/4_context_isolate.py",
-    }
+DEMOS = {
+    1: ("demos/1_context_write.py", "demo_context_write"),
+    2: ("demos/2_context_select.py", "demo_context_select"),
+    3: ("demos/3_context_compress.py", "demo_context_compress"),
+    4: ("demos/4_context_isolate.py", "demo_context_isolate"),
+}
+
+# Demo modules already imported in this process, keyed by demo number
+_loaded_demos = {}
+
+
+def load_demo(demo_number):
+    """
+    Import a demo module through importlib.
+
+    The demo files start with a digit, so they cannot be imported by name.
+    Loading them from a file spec still goes through the regular source
+    loader, which compiles once and reuses the cached bytecode in
+    demos/__pycache__ on later runs.
+
+    Args:
+        demo_number: Demo number (1-4)
+
+    Returns:
+        The imported demo module
+    """
+    if demo_number in _loaded_demos:
+        return _loaded_demos[demo_number]
+
+    relative_path, _ = DEMOS[demo_number]
+    demo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), relative_path)
+    module_name = "demo_" + os.path.splitext(os.path.basename(demo_path))[0]
+
+    spec = importlib.util.spec_from_file_location(module_name, demo_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[module_name]
+        raise
+
+    _loaded_demos[demo_number] = module
+    return module
 
-    if demo_number not in demos:
-        print_error("Invalid demo number")
-        return
 
-    demo_path = os.path.join(os.path.dirname(__file__), demos[demo_number])
+def run_demo(demo_number):
+    """Run a specific demo and return its token stats."""
+    if demo_number not in DEMOS:
+        print_error("Invalid demo number")
+        return None
 
     try:
         print_info(f"Running Demo {demo_number}...")
         print("=" * 80 + "\n")
 
         # Execute the demo
-        with open(demo_path, 'r', encoding='utf-8') as f:
-            code = f.read()
-            exec(code, {'__name__': '__main__', '__file__': demo_path})
+        module = load_demo(demo_number)
+        stats = getattr(module, DEMOS[demo_number][1])()
 
         print("\n" + "=" * 80)
         print_success(f"Demo {demo_number} completed!")
+        return stats
 
     except Exception as e:
         print_error(f"Error running demo: {e}")
-        import traceback
         traceback.print_exc()
+        return None
+
+
+def _run_demo_captured(demo_number):
+    """
+    Run one demo with its output captured (batch worker).
+
+    Runs in a worker process, so it must stay a module-level function.
+
+    Returns:
+        Dictionary with demo number, status, wall-clock time, output and token stats
+    """
+    buffer = io.StringIO()
+    error = None
+    stats = None
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+        try:
+            module = load_demo(demo_number)
+            stats = getattr(module, DEMOS[demo_number][1])()
+        except (Exception, SystemExit) as e:  # demos call sys.exit() on config errors
+            error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+
+    return {
+        "demo": demo_number,
+        "ok": error is None,
+        "error": error,
+        "seconds": time.perf_counter() - start,
+        "output": buffer.getvalue(),
+        "stats": stats or {},
+    }
+
+
+def run_batch(max_workers=None):
+    """
+    Run demos 1-4 in parallel worker processes without prompting.
+
+    Each demo's output is captured separately and printed once it finishes,
+    followed by a wall-clock and token summary for every demo.
+
+    Args:
+        max_workers: Number of worker processes (defaults to one per demo)
+
+    Returns:
+        True if every demo succeeded
+    """
+    print_header("RUNNING ALL DEMOS (BATCH)")
+
+    demo_numbers = sorted(DEMOS)
+    results = {}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max_workers or len(demo_numbers)) as executor:
+        futures = [executor.submit(_run_demo_captured, n) for n in demo_numbers]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["demo"]] = result
+            print_info(f"Demo {result['demo']} finished in {result['seconds']:.2f}s")
+
+    total_seconds = time.perf_counter() - start
+
+    for demo_number in demo_numbers:
+        result = results[demo_number]
+        print_section(f"Demo {demo_number} Output")
+        print(result["output"])
+        if not result["ok"]:
+            print_error(f"Demo {demo_number} failed: {result['error']}")
+
+    print_section("Batch Summary")
+    print(f"{'Demo':<8} {'Status':<10} {'Wall (s)':<12} {'Original Tokens':<18} {'Final Tokens':<15}")
+    print('─' * 80)
+
+    for demo_number in demo_numbers:
+        result = results[demo_number]
+        stats = result["stats"]
+        status = "OK" if result["ok"] else "FAILED"
+        original = stats.get("original_tokens")
+        final = stats.get("final_tokens")
+        original = f"{original:,}" if original is not None else "-"
+        final = f"{final:,}" if final is not None else "-"
+        print(f"{demo_number:<8} {status:<10} {result['seconds']:<12.2f} {original:<18} {final:<15}")
+
+    sequential_seconds = sum(r["seconds"] for r in results.values())
+    print(f"\nTotal wall-clock: {total_seconds:.2f}s (sum of demo times: {sequential_seconds:.2f}s)")
+
+    return all(r["ok"] for r in results.values())
 
 
 def run_all_demos():
@@ -148,14 +281,35 @@ def run_all_demos():
     print("• Adapt strategies based on your specific needs")
 
 
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Context Engineering demo suite")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Run demos 1-4 in parallel without prompts and print a summary",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for --batch (default: one per demo)",
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main entry point."""
+    args = parse_args()
     print_welcome()
 
     # Check configuration
     if not check_config():
         sys.exit(1)
 
+    if args.batch:
+        sys.exit(0 if run_batch(args.workers) else 1)
+
     while True:
         print_menu()
 
@@ -184,7 +338,6 @@ def main():
 
         except Exception as e:
             print_error(f"An error occurred: {e}")
-            import traceback
             traceback.print_exc()
 
 
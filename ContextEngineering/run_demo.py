@@ -6,8 +6,9 @@ Non-interactive version for easy demonstration
 import json
 import sys
 import io
-from openai import OpenAI
 from utils import *
+from utils.message_store import MessageStore
+from utils.strategies import summarize_with_client
 from colorama import Fore, Style
 import time
 
@@ -26,9 +27,18 @@ print_header("CONTEXT ENGINEERING DEMO")
 print(f"{Fore.CYAN}Demonstrating 4 key context management techniques{Style.RESET_ALL}\n")
 
 config = load_config()
-client = OpenAI(api_key=config['api_key'])
+client = create_chat_client(config, "run_demo")
+response_cache = ResponseCache.from_config(config)
+if response_cache is not None:
+    client = response_cache.wrap(client)
+# The response cache skips sampled requests (unless cache_sampled_responses is set),
+# so a cached run asks for deterministic answers: a second run is then served from it
+deterministic = response_cache is not None and not response_cache.cache_sampled
 model = config['model']
 context_window = get_context_window_size(model)
+stream = config.get('stream', False)
+planner = BudgetPlanner.from_config(config)
+summarize = summarize_with_client(client, model)
 
 print_success(f"Using model: {model} (Context: {context_window:,} tokens)\n")
 time.sleep(1)
@@ -39,7 +49,8 @@ time.sleep(1)
 print_header("DEMO 1: WRITE - Context Growth Tracking")
 print_info("Showing how context accumulates with each message...\n")
 
-messages = [{"role": "system", "content": "You are a concise Python tutor."}]
+# The planner's reductions are views over this store, so no turn copies the history
+history = MessageStore.from_messages([{"role": "system", "content": "You are a concise Python tutor."}], model)
 
 questions = [
     "What is a Python list in one sentence?",
@@ -50,24 +61,31 @@ questions = [
 for i, q in enumerate(questions, 1):
     print(f"{Fore.YELLOW}Turn {i}: {q}{Style.RESET_ALL}")
 
-    messages.append({"role": "user", "content": q})
-
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=0.7,
-        max_tokens=100
+    history.append("user", q)
+
+    # Size the response to the window; reduce the prompt first if it would not fit
+    plan = planner.plan(history.view(), desired_output=100, summarize=summarize)
+    if plan['strategy']:
+        print_info(f"Prompt reduced with '{plan['strategy']}' to fit the window")
+
+    print(f"{Fore.BLUE}AI:{Style.RESET_ALL} ", end="", flush=True)
+    answer, latency = run_chat_completion(
+        client,
+        model,
+        plan['messages'],
+        stream=stream,
+        temperature=0 if deterministic else 0.7,
+        max_tokens=plan['max_tokens']
     )
+    history.append("assistant", answer)
 
-    answer = response.choices[0].message.content
-    messages.append({"role": "assistant", "content": answer})
-
-    print(f"{Fore.BLUE}AI:{Style.RESET_ALL} {answer}\n")
+    print("\n" if stream else f"{answer}\n")
 
-    tokens = estimate_tokens_for_messages(messages, model)
+    tokens = history.view().token_count()
     visualize_tokens(tokens, context_window, f"After Turn {i}")
+    print_latency(latency, f"Turn {i} Latency")
 
-print_success(f"Context grew from 0 to {estimate_tokens_for_messages(messages, model):,} tokens!")
+print_success(f"Context grew from 0 to {history.view().token_count():,} tokens!")
 print_info("Key insight: Context accumulates - monitoring is essential\n")
 time.sleep(2)
 
@@ -134,7 +152,7 @@ summary_response = client.chat.completions.create(
         "role": "user",
         "content": f"Summarize in 1 sentence:\n{long_text}"
     }],
-    temperature=0.5
+    temperature=0 if deterministic else 0.5
 )
 
 summary = summary_response.choices[0].message.content
@@ -223,5 +241,8 @@ print(f"              Prevents contamination, improves clarity\n")
 
 print(f"\n{Fore.YELLOW}Production Tip: Combine all 4 techniques for optimal results!{Style.RESET_ALL}\n")
 
+if response_cache is not None:
+    response_cache.print_stats()
+
 print_success("Demo complete! Check the code to see implementation details.")
 print_info(f"Approximate API cost for this demo: $0.01-0.03 ({model})\n")
@@ -6,7 +6,6 @@ Direct OpenAI implementation - easier to understand and explain!
 import json
 import sys
 import os
-from openai import OpenAI
 from utils import (
     print_header,
     print_section,
@@ -17,8 +16,14 @@ from utils import (
     count_tokens,
     print_success,
     print_info,
-    print_warning
+    print_warning,
+    print_latency,
+    create_chat_client,
+    run_chat_completion,
+    BudgetPlanner
 )
+from utils.message_store import MessageStore
+from utils.strategies import summarize_with_client
 from colorama import Fore, Style
 
 
@@ -34,16 +39,19 @@ def demo_1_write():
     print_header("DEMO 1: Context WRITE - Context Growth")
 
     config = load_config()
-    client = OpenAI(api_key=config['api_key'])
+    client = create_chat_client(config, "simple_demo")
     model = config['model']
     context_window = get_context_window_size(model)
+    stream = config.get('stream', False)
+    planner = BudgetPlanner.from_config(config)
+    summarize = summarize_with_client(client, model)
 
     print_section("Starting Conversation with Token Tracking")
 
-    # Conversation history
-    messages = [
+    # Conversation history (the planner's reductions are views over it, never copies)
+    history = MessageStore.from_messages([
         {"role": "system", "content": "You are a helpful Python programming assistant. Keep responses concise (2-3 sentences)."}
-    ]
+    ], model)
 
     questions = [
         "What is a Python list?",
@@ -59,38 +67,45 @@ def demo_1_write():
         print(f"{'═' * 80}{Style.RESET_ALL}\n")
 
         # Add user message
-        messages.append({"role": "user", "content": question})
-
-        # Get AI response
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
+        history.append("user", question)
+
+        # Size the response to the window; reduce the prompt first if it would not fit
+        plan = planner.plan(history.view(), desired_output=150, summarize=summarize)
+        if plan['strategy']:
+            print_info(f"Prompt reduced with '{plan['strategy']}' to fit the window")
+
+        # Get AI response (rendered as it arrives when streaming)
+        print(f"{Fore.BLUE}Assistant:{Style.RESET_ALL} ", end="", flush=True)
+        assistant_msg, latency = run_chat_completion(
+            client,
+            model,
+            plan['messages'],
+            stream=stream,
             temperature=0.7,
-            max_tokens=150
+            max_tokens=plan['max_tokens']
         )
+        print("\n" if stream else f"{assistant_msg}\n")
 
         # Add assistant response
-        assistant_msg = response.choices[0].message.content
-        messages.append({"role": "assistant", "content": assistant_msg})
-
-        # Count tokens
-        total_tokens = estimate_tokens_for_messages(messages, model)
+        history.append("assistant", assistant_msg)
 
-        print(f"{Fore.BLUE}Assistant:{Style.RESET_ALL} {assistant_msg}\n")
+        # Count tokens (from the store's cached per-message counts)
+        total_tokens = history.view().token_count()
 
         # Visualize
         visualize_tokens(total_tokens, context_window, f"Turn {i} - Context Usage")
+        print_latency(latency, f"Turn {i} - Latency")
 
         # Warning
         percentage = (total_tokens / context_window) * 100
         if percentage > 70:
             print_warning(f"Context at {percentage:.1f}% - Consider management!")
 
-        print(f"{Fore.CYAN}Messages: {len(messages)} | Tokens: {total_tokens:,}{Style.RESET_ALL}")
+        print(f"{Fore.CYAN}Messages: {len(history)} | Tokens: {total_tokens:,}{Style.RESET_ALL}")
 
     print_section("Key Insight")
     print_success("Context grows with each exchange - management is essential!")
-    print(f"Final context: {len(messages)} messages, {estimate_tokens_for_messages(messages, model):,} tokens\n")
+    print(f"Final context: {len(history)} messages, {history.view().token_count():,} tokens\n")
 
 
 def demo_2_select():
@@ -164,7 +179,7 @@ def demo_3_compress():
     print_header("DEMO 3: Context COMPRESS - Summarization")
 
     config = load_config()
-    client = OpenAI(api_key=config['api_key'])
+    client = create_chat_client(config, "simple_demo")
     model = config['model']
     context_window = get_context_window_size(model)
 
@@ -224,7 +239,7 @@ def demo_4_isolate():
     print_header("DEMO 4: Context ISOLATE - Separation")
 
     config = load_config()
-    client = OpenAI(api_key=config['api_key'])
+    client = create_chat_client(config, "simple_demo")
     model = config['model']
 
     print_section("Problem: Mixed Context (Without Isolation)")
@@ -1,16 +1,29 @@
 """Utility functions for context engineering demos."""
 
-from .token_counter import count_tokens, estimate_tokens_for_messages, get_context_window_size, calculate_token_percentage
+from .token_counter import (
+    count_tokens, estimate_tokens_for_messages, get_context_window_size, calculate_token_percentage,
+    estimate_cost, CONTEXT_WINDOWS, MODEL_PRICING
+)
 from .visualizer import (
     print_header, print_section, visualize_tokens, print_comparison,
-    print_messages, print_success, print_error, print_info, print_warning
+    print_messages, print_success, print_error, print_info, print_warning, print_latency
+)
+from .cassette import (
+    Cassette, CassetteChatClient, CassetteMissError, attach_cassette,
+    create_chat_client, get_llm_mode, request_key
 )
+from .response_cache import ResponseCache, CachedChatClient
+from .streaming import run_chat_completion
+from .budget_planner import BudgetPlanner, ContextBudgetError
 
 __all__ = [
     'count_tokens',
     'estimate_tokens_for_messages',
     'get_context_window_size',
     'calculate_token_percentage',
+    'estimate_cost',
+    'CONTEXT_WINDOWS',
+    'MODEL_PRICING',
     'print_header',
     'print_section',
     'visualize_tokens',
@@ -19,5 +32,18 @@ __all__ = [
     'print_success',
     'print_error',
     'print_info',
-    'print_warning'
+    'print_warning',
+    'print_latency',
+    'Cassette',
+    'CassetteChatClient',
+    'CassetteMissError',
+    'attach_cassette',
+    'create_chat_client',
+    'get_llm_mode',
+    'request_key',
+    'ResponseCache',
+    'CachedChatClient',
+    'run_chat_completion',
+    'BudgetPlanner',
+    'ContextBudgetError'
 ]
@@ -0,0 +1,120 @@
+"""Plan max_tokens from the context window, reducing the prompt before it overflows."""
+
+from typing import List, Dict, Any, Callable, Optional, Sequence, Union
+
+from .token_counter import CONTEXT_WINDOWS, estimate_tokens_for_messages, get_context_window_size
+from .message_store import MessageView
+from .strategies import STRATEGIES, apply_strategy
+from .visualizer import print_warning
+
+
+# Cheapest first: lossless dedup, then recency selection, then LLM compression
+DEFAULT_REDUCTIONS = ("dedup", "recent", "compress_partial", "minimal", "compress_aggressive")
+
+
+class ContextBudgetError(ValueError):
+    """Raised when no reduction leaves room for the minimum response."""
+
+
+class BudgetPlanner:
+    """
+    Chooses max_tokens for a request from the space left in the context window.
+
+    When the prompt plus the desired response would not fit, the planner
+    applies reduction strategies from utils.strategies in order, before the
+    request is sent, instead of letting the API reject it or cut the answer
+    short and paying for a retry.
+    """
+
+    def __init__(self, model: str, context_window: Optional[int] = None, safety_margin: int = 16,
+                 min_output_tokens: int = 32, reductions: Sequence[str] = DEFAULT_REDUCTIONS):
+        self.model = model
+        self.context_window = context_window or get_context_window_size(model)
+        self.safety_margin = safety_margin
+        self.min_output_tokens = min_output_tokens
+        self.reductions = tuple(reductions)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], model: Optional[str] = None) -> "BudgetPlanner":
+        """
+        Build a planner for the configured model.
+
+        The window comes from the config's context_window table when it lists
+        the model, otherwise from get_context_window_size(). A config entry
+        that disagrees with the built-in CONTEXT_WINDOWS table is still used,
+        with a warning, since planning against the wrong window either trims
+        history needlessly or overflows the real one.
+        """
+        model = model or config.get('model', 'gpt-3.5-turbo')
+        context_window = config.get('context_window', {}).get(model)
+        known = CONTEXT_WINDOWS.get(model)
+        if context_window is not None and known is not None and context_window != known:
+            print_warning(f"config.json sets {model}'s context window to {context_window:,} tokens, "
+                          f"but the model's window is {known:,}")
+        return cls(model, context_window=context_window)
+
+    def prompt_tokens(self, messages: Union[List[Dict[str, Any]], MessageView]) -> int:
+        """Estimated prompt tokens; views use the store's cached per-message counts."""
+        if isinstance(messages, MessageView):
+            return messages.token_count()
+        return estimate_tokens_for_messages(messages, self.model)
+
+    def remaining(self, messages: Union[List[Dict[str, Any]], MessageView]) -> int:
+        """Tokens left for the response after the prompt and the safety margin."""
+        return self.context_window - self.prompt_tokens(messages) - self.safety_margin
+
+    def plan(self, messages: Union[List[Dict[str, Any]], MessageView], desired_output: int, keywords: Optional[List[str]] = None,
+             summarize: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        Plan one request.
+
+        Args:
+            messages: Full conversation to send (list of dictionaries or a MessageView,
+                which lets every reduction share the history instead of copying it)
+            desired_output: Response length the caller would like (max_tokens)
+            keywords: Keywords for keyword-based reductions
+            summarize: Summarize function for compression reductions (skipped when None)
+
+        Returns:
+            Dictionary with messages (always a list) and max_tokens to send,
+            prompt_tokens, and strategy (the reduction applied, or None)
+
+        Raises:
+            ContextBudgetError: If even the last reduction leaves less than min_output_tokens
+        """
+        best = None
+
+        for strategy in (None,) + self.reductions:
+            if strategy is None:
+                reduced = messages
+            else:
+                if STRATEGIES[strategy][1] and summarize is None:
+                    continue
+                reduced = apply_strategy(strategy, messages, keywords=keywords, summarize=summarize)
+
+            available = self.remaining(reduced)
+            if available >= desired_output:
+                return self._plan(reduced, desired_output, strategy)
+            if available >= self.min_output_tokens and best is None:
+                # Keep the least-reduced prompt that still allows a shorter answer
+                best = (reduced, available, strategy)
+
+        if best is not None:
+            reduced, available, strategy = best
+            return self._plan(reduced, available, strategy)
+
+        raise ContextBudgetError(
+            f"Prompt does not leave {self.min_output_tokens} tokens for a response "
+            f"in the {self.context_window:,}-token window of {self.model}, even after reduction"
+        )
+
+    def _plan(self, messages, max_tokens, strategy):
+        prompt_tokens = self.prompt_tokens(messages)
+        if isinstance(messages, MessageView):
+            messages = messages.to_messages()
+        return {
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "prompt_tokens": prompt_tokens,
+            "strategy": strategy,
+        }
@@ -0,0 +1,435 @@
+"""Record/replay layer for LLM calls so demos can run offline and deterministically."""
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+LLM_MODES = ("live", "record", "replay")
+
+# Environment variable that overrides the "llm_mode" config key
+LLM_MODE_ENV = "CONTEXT_LLM_MODE"
+
+DEFAULT_CASSETTE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cassettes")
+
+# Cassettes already opened in this process, keyed by absolute path
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """Hold an exclusive lock on path + ".lock" (across processes) for the duration of the block."""
+    with open(path + ".lock", 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def get_llm_mode(config: Dict[str, Any]) -> str:
+    """
+    Get the LLM backend mode from the environment or config.
+
+    Args:
+        config: Loaded config.json dictionary
+
+    Returns:
+        One of "live", "record" or "replay"
+    """
+    mode = os.environ.get(LLM_MODE_ENV) or config.get('llm_mode', 'live')
+    mode = mode.lower()
+    if mode not in LLM_MODES:
+        raise ValueError(f"Unknown llm_mode '{mode}', expected one of {', '.join(LLM_MODES)}")
+    return mode
+
+
+def canonical_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Reduce messages to the fields that affect the completion."""
+    return [
+        {key: message[key] for key in ("role", "content", "name") if message.get(key) is not None}
+        for message in messages
+    ]
+
+
+def request_key(model: str, messages: List[Dict[str, Any]], **params) -> str:
+    """
+    Build a stable hash for a chat completion request.
+
+    Args:
+        model: Model name
+        messages: Request messages
+        **params: Sampling parameters (temperature, max_tokens, ...); None values are ignored
+
+    Returns:
+        Hex digest identifying the request
+    """
+    payload = {
+        "model": model,
+        "messages": canonical_messages(messages),
+        "params": {key: value for key, value in params.items() if value is not None},
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def make_chat_response(content: str, model: str, usage: Optional[Dict[str, int]] = None):
+    """Build an object shaped like an OpenAI chat completion response."""
+    usage = usage or {}
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(
+            index=0,
+            message=SimpleNamespace(role="assistant", content=content),
+            finish_reason="stop",
+        )],
+        usage=SimpleNamespace(
+            prompt_tokens=usage.get('prompt_tokens', 0),
+            completion_tokens=usage.get('completion_tokens', 0),
+            total_tokens=usage.get('total_tokens', 0),
+        ),
+    )
+
+
+def make_chat_chunk(content: Optional[str], finish_reason: Optional[str] = None):
+    """Build an object shaped like an OpenAI streaming chat completion chunk."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(
+            index=0,
+            delta=SimpleNamespace(content=content),
+            finish_reason=finish_reason,
+        )],
+        usage=None,
+    )
+
+
+def iter_stream_text(stream):
+    """Yield the text deltas of an OpenAI-style chat completion stream."""
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            yield content
+
+
+class Cassette:
+    """
+    A local store of recorded LLM completions.
+
+    In "record" mode, requests missing from the store are sent to the real
+    backend and saved together with their latency. In "replay" mode, every
+    request must already be recorded; the stored response is returned after
+    sleeping for the recorded latency (scaled by latency_scale).
+
+    Several processes may record into the same file (e.g. benchmark worker
+    pools): each save takes a file lock and merges the entries already on
+    disk, so no process overwrites another's recordings.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 1.0):
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f).get('entries', {})
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], name: str) -> "Cassette":
+        """
+        Open the cassette called `name` using the settings in config.json.
+
+        Cassettes are shared per file within a process so that several
+        clients recording into the same file do not overwrite each other.
+        """
+        cassette_dir = config.get('cassette_dir') or DEFAULT_CASSETTE_DIR
+        if not os.path.isabs(cassette_dir):
+            cassette_dir = os.path.join(os.path.dirname(DEFAULT_CASSETTE_DIR), cassette_dir)
+        path = os.path.join(cassette_dir, f"{name}.json")
+
+        with _cassettes_lock:
+            cassette = _cassettes.get(path)
+            if cassette is None:
+                cassette = cls(path, get_llm_mode(config), config.get('replay_latency_scale', 1.0))
+                _cassettes[path] = cassette
+        return cassette
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the recorded entry for a request key, if any (entries without content count as missing)."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry.get('content') is None:
+            return None
+        return entry
+
+    def record(self, key: str, request: Dict[str, Any], content: str, latency: float,
+               usage: Optional[Dict[str, int]] = None, ttft: Optional[float] = None) -> Dict[str, Any]:
+        """Store a completion and write the cassette to disk."""
+        entry = {
+            "request": request,
+            "content": content,
+            "latency": latency,
+            "usage": usage or {},
+        }
+        if ttft is not None:
+            entry['ttft'] = ttft
+        with self._lock:
+            self._entries[key] = entry
+            self._save()
+        return entry
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with _file_lock(self.path):
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    on_disk = json.load(f).get('entries', {})
+                self._entries = {**on_disk, **self._entries}
+
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": 1, "entries": self._entries}, f, indent=2, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def replay(self, entry: Dict[str, Any]) -> str:
+        """Sleep for the recorded latency and return the recorded content."""
+        delay = entry.get('latency', 0.0) * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        return entry['content']
+
+    def replay_stream(self, entry: Dict[str, Any]):
+        """
+        Yield the recorded content in word-sized pieces with recorded timing.
+
+        The first piece arrives after the recorded time to first token and the
+        rest are spread over the remaining latency. Entries recorded without
+        streaming have no time to first token, so their text arrives at the
+        end of the recorded latency.
+        """
+        latency = entry.get('latency', 0.0) * self.latency_scale
+        ttft = min(entry.get('ttft', entry.get('latency', 0.0)) * self.latency_scale, latency)
+        pieces = re.findall(r"\s*\S+\s*", entry['content']) or [entry['content']]
+        gap = (latency - ttft) / len(pieces)
+
+        if ttft > 0:
+            time.sleep(ttft)
+        for i, piece in enumerate(pieces):
+            if i and gap > 0:
+                time.sleep(gap)
+            yield piece
+
+    def _check_recordable(self, key: str):
+        if self.mode != "record":
+            raise CassetteMissError(
+                f"No recorded response for request {key[:12]} in {self.path}. "
+                f"Run once with llm_mode=record to record it."
+            )
+
+    def fetch_stream(self, key: str, request: Dict[str, Any], call_stream):
+        """
+        Return an iterator of text deltas for a request, recording it if needed.
+
+        Args:
+            key: Request key from request_key()
+            request: Request description stored alongside the response
+            call_stream: Function starting the real request, returning an iterator of text deltas
+        """
+        entry = self.lookup(key)
+        if entry is not None:
+            return self.replay_stream(entry)
+
+        self._check_recordable(key)
+
+        def record_stream():
+            start = time.perf_counter()
+            ttft = None
+            parts = []
+            for text in call_stream():
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(text)
+                yield text
+            self.record(key, request, "".join(parts), time.perf_counter() - start, ttft=ttft)
+
+        return record_stream()
+
+    def fetch(self, key: str, request: Dict[str, Any], call):
+        """
+        Return (content, usage) for a request, recording it if needed.
+
+        Args:
+            key: Request key from request_key()
+            request: Request description stored alongside the response
+            call: Function performing the real request, returning (content, usage)
+
+        A request that produced no content (None) is returned as is and not
+        recorded, so replay never serves a failed call as a hit.
+        """
+        entry = self.lookup(key)
+        if entry is not None:
+            return self.replay(entry), entry.get('usage', {})
+
+        self._check_recordable(key)
+
+        start = time.perf_counter()
+        content, usage = call()
+        if content is not None:
+            self.record(key, request, content, time.perf_counter() - start, usage)
+        return content, usage
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner.create(**kwargs)
+
+
+class CassetteChatClient:
+    """
+    Drop-in replacement for the parts of the OpenAI client the demos use.
+
+    Exposes client.chat.completions.create(...) and serves responses from a
+    cassette, falling through to the wrapped client when recording.
+    """
+
+    def __init__(self, cassette: Cassette, client=None):
+        self.cassette = cassette
+        self.client = client
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, **params):
+        # Streamed and non-streamed requests produce the same completion, so they share a key
+        key = request_key(model, messages, **params)
+        request = {"model": model, "messages": canonical_messages(messages), "params": params}
+
+        if stream:
+            def call_stream():
+                if self.client is None:
+                    raise CassetteMissError("No live client available to record with")
+                return iter_stream_text(self.client.chat.completions.create(
+                    model=model, messages=messages, stream=True, **params
+                ))
+
+            texts = self.cassette.fetch_stream(key, request, call_stream)
+            return (make_chat_chunk(text) for text in texts)
+
+        def call():
+            if self.client is None:
+                raise CassetteMissError("No live client available to record with")
+            response = self.client.chat.completions.create(model=model, messages=messages, **params)
+            usage = {}
+            if getattr(response, 'usage', None) is not None:
+                usage = {
+                    "prompt_tokens": response.usage.prompt_tokens,
+                    "completion_tokens": response.usage.completion_tokens,
+                    "total_tokens": response.usage.total_tokens,
+                }
+            return response.choices[0].message.content, usage
+
+        content, usage = self.cassette.fetch(key, request, call)
+        return make_chat_response(content, model, usage)
+
+
+def create_chat_client(config: Dict[str, Any], cassette_name: str):
+    """
+    Create the chat client for a script according to its llm_mode.
+
+    Args:
+        config: Loaded config.json dictionary
+        cassette_name: Cassette file (without extension) used in record/replay mode
+
+    Returns:
+        An OpenAI client in live mode, otherwise a CassetteChatClient
+    """
+    mode = get_llm_mode(config)
+    if mode == "replay":
+        return CassetteChatClient(Cassette.from_config(config, cassette_name))
+
+    from openai import OpenAI
+    client = OpenAI(api_key=config['api_key'])
+    if mode == "live":
+        return client
+    return CassetteChatClient(Cassette.from_config(config, cassette_name), client)
+
+
+def attach_cassette(agent, cassette: Cassette):
+    """
+    Route an AutoGen ConversableAgent's LLM replies through a cassette.
+
+    Registers a reply function ahead of the agent's built-in OpenAI reply.
+    In live mode the agent is left untouched.
+
+    Args:
+        agent: ConversableAgent with an llm_config
+        cassette: Cassette to record into / replay from
+
+    Returns:
+        The same agent
+    """
+    if cassette.mode == "live":
+        return agent
+
+    from autogen import Agent
+
+    llm_config = agent.llm_config or {}
+    model = llm_config.get('config_list', [{}])[0].get('model')
+    temperature = llm_config.get('temperature')
+
+    def cassette_reply(recipient, messages=None, sender=None, config=None):
+        if messages is None:
+            messages = recipient.chat_messages[sender]
+        request_messages = recipient._oai_system_message + list(messages)
+        key = request_key(model, request_messages, temperature=temperature)
+        request = {
+            "model": model,
+            "messages": canonical_messages(request_messages),
+            "params": {"temperature": temperature},
+        }
+
+        def call():
+            final, reply = recipient.generate_oai_reply(messages, sender, config)
+            if isinstance(reply, dict):
+                reply = reply.get('content')
+            return (reply if final else None), {}
+
+        content, _ = cassette.fetch(key, request, call)
+        # No reply: let the agent's other reply functions handle the message, as generate_oai_reply does
+        return content is not None, content
+
+    agent.register_reply([Agent, None], cassette_reply, position=0)
+    return agent
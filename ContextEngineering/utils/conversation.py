@@ -0,0 +1,143 @@
+"""Immutable conversations with structural sharing for cheap branching."""
+
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from .token_counter import count_tokens
+
+
+# Matches estimate_tokens_for_messages: per-message framing and reply priming
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class _Node:
+    """One message plus a link to the conversation before it."""
+
+    __slots__ = ("message", "parent", "length", "tokens")
+
+    def __init__(self, message, parent, tokens):
+        self.message = message
+        self.parent = parent
+        self.length = (parent.length if parent else 0) + 1
+        # Cumulative tokens of every message up to and including this one
+        self.tokens = (parent.tokens if parent else 0) + tokens
+
+
+class Conversation:
+    """
+    Persistent (immutable) conversation history.
+
+    The history is a linked list from the newest message back to the first.
+    Appending creates one node that points at the existing history, so every
+    branch shares its common prefix with the others: branching or
+    snapshotting is O(1) in time and memory whatever the history length, and
+    a branch can never change what another branch sees.
+
+    Length and token count are cached on each node, so both are O(1).
+    Materializing the messages for an API call is O(n).
+    """
+
+    __slots__ = ("model", "_head")
+
+    def __init__(self, model: str = "gpt-3.5-turbo", _head: Optional[_Node] = None):
+        self.model = model
+        self._head = _head
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Dict[str, Any]], model: str = "gpt-3.5-turbo") -> "Conversation":
+        """Build a conversation from a list of message dictionaries."""
+        return cls(model).extend(messages)
+
+    def _count(self, message: Dict[str, Any]) -> int:
+        tokens = TOKENS_PER_MESSAGE
+        for key, value in message.items():
+            if isinstance(value, str):
+                tokens += count_tokens(value, self.model)
+                if key == "name":
+                    tokens += 1
+        return tokens
+
+    def append(self, message: Dict[str, Any]) -> "Conversation":
+        """Return a new conversation with one more message (O(1); self is unchanged)."""
+        return Conversation(self.model, _Node(message, self._head, self._count(message)))
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> "Conversation":
+        """Return a new conversation with several more messages."""
+        head = self._head
+        for message in messages:
+            head = _Node(message, head, self._count(message))
+        return Conversation(self.model, head)
+
+    def branch(self) -> "Conversation":
+        """
+        Start an independent branch from this point (O(1)).
+
+        Conversations are immutable, so a branch simply shares this history;
+        appending to either one never affects the other.
+        """
+        return Conversation(self.model, self._head)
+
+    snapshot = branch
+
+    def __len__(self):
+        return self._head.length if self._head else 0
+
+    def token_count(self) -> int:
+        """Estimated prompt tokens (same estimate as estimate_tokens_for_messages), in O(1)."""
+        return (self._head.tokens if self._head else 0) + TOKENS_PER_REPLY
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        """The newest message, or None for an empty conversation."""
+        return self._head.message if self._head else None
+
+    def _nodes(self, limit: Optional[int] = None) -> List[_Node]:
+        """Nodes from newest to oldest, at most limit of them."""
+        nodes = []
+        node = self._head
+        while node is not None and (limit is None or len(nodes) < limit):
+            nodes.append(node)
+            node = node.parent
+        return nodes
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        """The last count messages, oldest first (O(count))."""
+        return [node.message for node in reversed(self._nodes(count))]
+
+    def to_messages(self) -> List[Dict[str, Any]]:
+        """Materialize the conversation as a list of message dictionaries (e.g. for an API call)."""
+        return [node.message for node in reversed(self._nodes())]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_messages())
+
+    def common_ancestor_length(self, other: "Conversation") -> int:
+        """
+        Number of leading messages the two conversations share structurally
+        (i.e. one was branched from the other, or both from a common point).
+
+        Walks up from the longer branch until both are at the same depth, then
+        up both until they meet, so the cost is proportional to how far the
+        branches have diverged rather than to the total history.
+        """
+        def depth(node):
+            return node.length if node else 0
+
+        a, b = self._head, other._head
+        while depth(a) > depth(b):
+            a = a.parent
+        while depth(b) > depth(a):
+            b = b.parent
+        while a is not b:
+            a, b = a.parent, b.parent
+        return a.length if a else 0
+
+    def diff(self, other: "Conversation") -> Tuple[int, List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Compare two branches.
+
+        Returns:
+            Tuple of (shared prefix length, messages only in self, messages only in other),
+            each list oldest first
+        """
+        shared = self.common_ancestor_length(other)
+        return shared, self.tail(len(self) - shared), other.tail(len(other) - shared)
@@ -0,0 +1,136 @@
+"""Repeated-block deduplication for conversation context."""
+
+from typing import List, Dict, Any, Tuple
+
+from .token_counter import count_tokens
+
+
+# Polynomial rolling hash over line ids, modulo a Mersenne prime
+_HASH_BASE = 1_000_003
+_HASH_MOD = (1 << 61) - 1
+
+REFERENCE_TEMPLATE = "[repeated: same as message {message}, lines {first}-{last}]"
+
+
+def _line_ids(lines, interned):
+    """Map each line (ignoring trailing whitespace) to a small integer id."""
+    ids = []
+    for line in lines:
+        key = line.rstrip()
+        line_id = interned.get(key)
+        if line_id is None:
+            line_id = interned[key] = len(interned) + 1
+        ids.append(line_id)
+    return ids
+
+
+def _window_hashes(ids, window):
+    """Rolling hash of every run of `window` consecutive line ids."""
+    if len(ids) < window:
+        return []
+    top = pow(_HASH_BASE, window - 1, _HASH_MOD)
+    value = 0
+    for line_id in ids[:window]:
+        value = (value * _HASH_BASE + line_id) % _HASH_MOD
+    hashes = [value]
+    for i in range(window, len(ids)):
+        value = ((value - ids[i - window] * top) * _HASH_BASE + ids[i]) % _HASH_MOD
+        hashes.append(value)
+    return hashes
+
+
+def dedupe_messages(messages: List[Dict[str, Any]], min_lines: int = 3, min_chars: int = 80,
+                    model: str = "gpt-3.5-turbo") -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Replace blocks of lines already seen in an earlier message with a back-reference.
+
+    Each message is split into lines and every window of min_lines lines is
+    hashed with a rolling hash. A window whose hash was seen in an earlier
+    message is verified line by line, extended as far as the lines keep
+    matching, and replaced with a one-line reference to the first copy. Every
+    line is hashed, looked up and compared a constant number of times, so the
+    pass is linear in the size of the conversation.
+
+    The first copy of each block is left untouched, so the model can still
+    resolve every reference as long as earlier messages stay in the prompt.
+    References only point at lines an earlier message kept verbatim, and
+    their line numbers count lines of that message as deduplicated.
+
+    Args:
+        messages: List of message dictionaries
+        min_lines: Shortest block (in lines) worth replacing
+        min_chars: Shortest block (in characters) worth replacing
+        model: Model name used to count the tokens saved
+
+    Returns:
+        Tuple of (deduplicated messages, stats with blocks, lines and tokens_saved)
+    """
+    interned = {}
+    first_seen = {}  # window hash -> (message index, line index in the deduplicated text)
+    message_ids = []  # line ids of each deduplicated message; references get unique negative ids
+    stats = {"blocks": 0, "lines": 0, "tokens_saved": 0}
+    result = []
+
+    for position, message in enumerate(messages):
+        content = message.get('content') or ""
+        lines = content.split("\n")
+        ids = _line_ids(lines, interned)
+        hashes = _window_hashes(ids, min_lines)
+
+        output = []
+        output_ids = []
+        replaced = False
+        i = 0
+        while i < len(lines):
+            match = first_seen.get(hashes[i]) if i < len(hashes) else None
+            if match is not None and message.get('role') != 'system':
+                source, start = match
+                source_ids = message_ids[source]
+                length = 0
+                while (i + length < len(ids) and start + length < len(source_ids)
+                       and ids[i + length] == source_ids[start + length]):
+                    length += 1
+
+                block_chars = sum(len(line) + 1 for line in lines[i:i + length])
+                if length >= min_lines and block_chars >= min_chars:
+                    output.append(REFERENCE_TEMPLATE.format(
+                        message=source + 1, first=start + 1, last=start + length
+                    ))
+                    # Never equal to a real line, so later blocks cannot match across the reference
+                    output_ids.append(-len(output))
+                    stats['blocks'] += 1
+                    stats['lines'] += length
+                    replaced = True
+                    i += length
+                    continue
+                if length >= min_lines:
+                    # Too short to be worth a reference; keep it verbatim without rescanning it
+                    output.extend(lines[i:i + length])
+                    output_ids.extend(ids[i:i + length])
+                    i += length
+                    continue
+
+            output.append(lines[i])
+            output_ids.append(ids[i])
+            i += 1
+
+        # Register this message's windows only now, so references always point to earlier messages.
+        # Only windows of lines kept verbatim are registered, numbered by their position in the
+        # deduplicated text, so every reference resolves against what the model actually sees.
+        message_ids.append(output_ids)
+        output_hashes = _window_hashes(output_ids, min_lines)
+        verbatim_run = 0
+        for end, line_id in enumerate(output_ids):
+            verbatim_run = verbatim_run + 1 if line_id > 0 else 0
+            if verbatim_run >= min_lines:
+                start = end - min_lines + 1
+                first_seen.setdefault(output_hashes[start], (position, start))
+
+        if replaced:
+            new_content = "\n".join(output)
+            stats['tokens_saved'] += count_tokens(content, model) - count_tokens(new_content, model)
+            result.append({**message, "content": new_content})
+        else:
+            result.append(message)
+
+    return result, stats
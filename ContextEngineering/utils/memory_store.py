@@ -0,0 +1,213 @@
+"""External long-term memory for conversations, backed by SQLite FTS5."""
+
+import math
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Optional
+
+from .token_counter import count_tokens
+from .strategies import extract_keywords
+
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS memories USING fts5(
+    content,
+    role UNINDEXED,
+    kind UNINDEXED,
+    tokens UNINDEXED,
+    created UNINDEXED,
+    tokenize = 'porter unicode61'
+)
+"""
+
+INSERT_SQL = "INSERT INTO memories (content, role, kind, tokens, created) VALUES (?, ?, ?, ?, ?)"
+
+# Most recent rows containing one term; FTS5 walks its doclists in rowid order,
+# so the LIMIT stops the scan early even for very common terms
+TERM_SQL = "SELECT rowid FROM memories WHERE memories MATCH ? ORDER BY rowid DESC LIMIT ?"
+
+
+def query_terms(text: str, limit: int = 8) -> List[str]:
+    """
+    Pick the search terms for a recall query, quoted as FTS5 phrases.
+
+    Quoting keeps punctuation and FTS5 operators in the text from breaking
+    the query; the porter tokenizer still stems each term.
+    """
+    return [f'"{keyword}"' for keyword in extract_keywords(text, limit=limit)]
+
+
+class MemoryStore:
+    """
+    Long-term memory kept outside the prompt.
+
+    Messages and summaries are written to a single FTS5 table; before each
+    turn, recall() returns the best-matching memories that fit a token budget,
+    so old turns can leave the prompt entirely and come back only when they
+    are relevant.
+
+    Recall cost is bounded by `candidates` rather than by the size of the
+    store: each query term fetches at most `candidates` of its most recent
+    matches, and candidates are ranked by the summed inverse document
+    frequency of the terms they contain. Terms that hit the cap are common by
+    definition and get the smallest weight, so a rare identifier in the
+    question outranks filler words. (SQLite's built-in bm25() is avoided on
+    purpose: it reads every match of every term to compute its statistics,
+    which takes tens of milliseconds once a term matches a large share of a
+    million rows.)
+    """
+
+    def __init__(self, path: str = ":memory:", model: str = "gpt-3.5-turbo", candidates: int = 200):
+        self.path = path
+        self.model = model
+        self.candidates = candidates
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT count(*) FROM memories").fetchone()[0]
+
+    def _rows(self, entries):
+        now = time.time()
+        for role, content, kind in entries:
+            yield content, role, kind, count_tokens(f"{role}: {content}", self.model), now
+
+    def write(self, role: str, content: str) -> int:
+        """
+        Store one message.
+
+        Returns:
+            Row id of the new memory
+        """
+        with self._lock:
+            cursor = self._conn.execute(INSERT_SQL, next(self._rows([(role, content, "message")])))
+            self._conn.commit()
+            self._total += 1
+            return cursor.lastrowid
+
+    def write_messages(self, messages: Iterable[Dict[str, Any]]) -> int:
+        """
+        Store several messages in one transaction (system messages are skipped).
+
+        Returns:
+            Number of messages written
+        """
+        entries = [
+            (m['role'], m.get('content') or "", "message")
+            for m in messages if m.get('role') != 'system' and m.get('content')
+        ]
+        with self._lock:
+            self._conn.executemany(INSERT_SQL, self._rows(entries))
+            self._conn.commit()
+            self._total += len(entries)
+        return len(entries)
+
+    def write_summary(self, summary: str) -> int:
+        """
+        Store a summary of earlier turns.
+
+        Returns:
+            Row id of the new memory
+        """
+        with self._lock:
+            cursor = self._conn.execute(INSERT_SQL, next(self._rows([("system", summary, "summary")])))
+            self._conn.commit()
+            self._total += 1
+            return cursor.lastrowid
+
+    def recall(self, query: str, token_budget: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Find the memories that best match a query and fit in a token budget.
+
+        Args:
+            query: Text to match (usually the new user message)
+            token_budget: Maximum total tokens of the returned memories
+            limit: Maximum number of memories to return
+
+        Returns:
+            Memories in chronological order, each with id, role, kind, content, tokens and score
+        """
+        terms = query_terms(query)
+        if not terms or token_budget <= 0:
+            return []
+
+        with self._lock:
+            scores = {}
+            for term in terms:
+                rowids = [row[0] for row in self._conn.execute(TERM_SQL, (term, self.candidates))]
+                if not rowids:
+                    continue
+                weight = math.log(1 + self._total / len(rowids))
+                for rowid in rowids:
+                    scores[rowid] = scores.get(rowid, 0.0) + weight
+
+            # Best score first, most recent first among equal scores
+            ranked = sorted(scores, key=lambda rowid: (-scores[rowid], -rowid))[:self.candidates]
+            rows = {}
+            if ranked:
+                placeholders = ",".join("?" * len(ranked))
+                for row in self._conn.execute(
+                    f"SELECT rowid, role, kind, content, tokens FROM memories WHERE rowid IN ({placeholders})",
+                    ranked
+                ):
+                    rows[row[0]] = row
+
+        recalled = []
+        used = 0
+        for rowid in ranked:
+            _, role, kind, content, tokens = rows[rowid]
+            if used + tokens > token_budget:
+                continue
+            recalled.append({
+                "id": rowid, "role": role, "kind": kind, "content": content,
+                "tokens": tokens, "score": scores[rowid]
+            })
+            used += tokens
+            if len(recalled) >= limit:
+                break
+
+        recalled.sort(key=lambda memory: memory['id'])
+        return recalled
+
+    def optimize(self):
+        """
+        Merge the full-text index into a single segment.
+
+        Every write transaction adds an index segment that recall has to
+        search; run this after bulk writes (or periodically) to keep recall fast.
+        """
+        with self._lock:
+            self._conn.execute("INSERT INTO memories (memories) VALUES ('optimize')")
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Number of stored memories."""
+        return self._total
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def memories_to_message(memories: List[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    """
+    Format recalled memories as a single system message for the prompt.
+
+    Returns:
+        A system message, or None when nothing was recalled
+    """
+    if not memories:
+        return None
+    lines = []
+    for memory in memories:
+        label = "summary" if memory['kind'] == "summary" else memory['role']
+        lines.append(f"- [{label}] {memory['content']}")
+    return {
+        "role": "system",
+        "content": "Relevant memories from earlier in the conversation:\n" + "\n".join(lines)
+    }
@@ -0,0 +1,225 @@
+"""Compact, append-only message storage with cheap immutable views."""
+
+from array import array
+from typing import List, Dict, Any, Callable, Iterable, Optional
+
+from .token_counter import count_tokens
+
+
+ROLES = ("system", "user", "assistant", "function", "tool")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# Matches estimate_tokens_for_messages: per-message framing and reply priming
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class MessageStore:
+    """
+    Column-oriented storage for a long conversation.
+
+    Roles are stored as one byte each, token counts as 32-bit integers, and
+    contents as references to the original strings (never copied). The store
+    is append-only, so indices are stable and views over it stay valid as the
+    conversation grows.
+    """
+
+    __slots__ = ("model", "_roles", "_contents", "_tokens")
+
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        self.model = model
+        self._roles = array('B')
+        self._contents = []
+        self._tokens = array('I')
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Dict[str, Any]], model: str = "gpt-3.5-turbo") -> "MessageStore":
+        """Build a store from a list of message dictionaries."""
+        store = cls(model)
+        store.extend(messages)
+        return store
+
+    def append(self, role: str, content: str, tokens: Optional[int] = None) -> int:
+        """
+        Append a message.
+
+        Args:
+            role: Message role (one of ROLES)
+            content: Message text
+            tokens: Token count of role + content, if already known
+
+        Returns:
+            Index of the new message
+        """
+        if tokens is None:
+            tokens = count_tokens(role, self.model) + count_tokens(content, self.model)
+        self._roles.append(_ROLE_CODES[role])
+        self._contents.append(content)
+        self._tokens.append(tokens)
+        return len(self._contents) - 1
+
+    def extend(self, messages: Iterable[Dict[str, Any]]):
+        """Append several message dictionaries."""
+        for message in messages:
+            self.append(message['role'], message.get('content') or "")
+
+    def __len__(self):
+        return len(self._contents)
+
+    def role(self, index: int) -> str:
+        return ROLES[self._roles[index]]
+
+    def content(self, index: int) -> str:
+        return self._contents[index]
+
+    def tokens(self, index: int) -> int:
+        return self._tokens[index]
+
+    def message(self, index: int) -> Dict[str, str]:
+        """Materialize one message as a dictionary."""
+        return {"role": ROLES[self._roles[index]], "content": self._contents[index]}
+
+    def view(self, start: int = 0, stop: Optional[int] = None) -> "MessageView":
+        """View of a contiguous range of messages (no copying)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return MessageView(self, start, stop)
+
+    def view_of(self, indices: Iterable[int]) -> "MessageView":
+        """View of arbitrary messages, in the given order."""
+        return MessageView(self, indices=array('I', indices))
+
+
+class MessageView:
+    """
+    Immutable view over messages in a MessageStore.
+
+    A view is either a contiguous range (two integers) or an array of
+    indices. Slicing a range view is O(1); filtering builds an index array of
+    4 bytes per selected message. Messages are only turned into dictionaries
+    when iterated or passed to to_messages().
+    """
+
+    __slots__ = ("_store", "_start", "_stop", "_indices")
+
+    def __init__(self, store: MessageStore, start: int = 0, stop: int = 0, indices: Optional[array] = None):
+        self._store = store
+        self._start = start
+        self._stop = stop
+        self._indices = indices
+
+    def indices(self):
+        """Store indices covered by this view, in order."""
+        if self._indices is None:
+            return range(self._start, self._stop)
+        return self._indices
+
+    def __len__(self):
+        if self._indices is None:
+            return max(0, self._stop - self._start)
+        return len(self._indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if self._indices is None and key.step in (None, 1):
+                start, stop, _ = key.indices(len(self))
+                return MessageView(self._store, self._start + start, self._start + max(start, stop))
+            return MessageView(self._store, indices=array('I', self.indices()[key]))
+        return self._store.message(self.indices()[key])
+
+    def __iter__(self):
+        message = self._store.message
+        for index in self.indices():
+            yield message(index)
+
+    def __add__(self, other: "MessageView") -> "MessageView":
+        if other._store is not self._store:
+            raise ValueError("Cannot combine views of different stores")
+        combined = array('I', self.indices())
+        combined.extend(other.indices())
+        return MessageView(self._store, indices=combined)
+
+    def filter(self, predicate: Callable[[str, str], bool]) -> "MessageView":
+        """Keep the messages for which predicate(role, content) is true."""
+        store = self._store
+        return MessageView(store, indices=array('I', (
+            i for i in self.indices() if predicate(ROLES[store._roles[i]], store._contents[i])
+        )))
+
+    def token_count(self) -> int:
+        """Estimated prompt tokens, computed from the cached per-message counts."""
+        tokens = self._store._tokens
+        if self._indices is None:
+            total = sum(tokens[self._start:self._stop])
+        else:
+            total = sum(tokens[i] for i in self._indices)
+        return total + TOKENS_PER_MESSAGE * len(self) + TOKENS_PER_REPLY
+
+    def to_messages(self) -> List[Dict[str, str]]:
+        """Materialize the view as a list of message dictionaries (e.g. for an API call)."""
+        return list(self)
+
+
+def _system_indices(view: MessageView) -> array:
+    """Indices of system messages in a view; range views are scanned at C speed."""
+    store = view._store
+    system_code = _ROLE_CODES['system']
+    found = array('I')
+
+    if view._indices is None:
+        roles = store._roles[view._start:view._stop].tobytes()
+        marker = bytes([system_code])
+        position = roles.find(marker)
+        while position != -1:
+            found.append(view._start + position)
+            position = roles.find(marker, position + 1)
+    else:
+        found.extend(i for i in view._indices if store._roles[i] == system_code)
+    return found
+
+
+def select_relevant_view(view: MessageView, keywords=None, max_messages=5, keep_system=True) -> MessageView:
+    """
+    View-based equivalent of strategies.select_relevant_messages.
+
+    Only the last max_messages matches are kept, so the history is scanned
+    backwards and the scan stops as soon as enough messages are found; for
+    the usual "recent" case that is O(max_messages) instead of O(history).
+
+    Args:
+        view: Messages to select from
+        keywords: List of keywords to match (if None, use recency)
+        max_messages: Maximum number of non-system messages to keep (0 keeps
+            all of them, like the [-0:] slice in select_relevant_messages)
+        keep_system: Whether to always keep system messages
+
+    Returns:
+        A view sharing storage with the input
+    """
+    store = view._store
+    system_code = _ROLE_CODES['system']
+    lowered = [keyword.lower() for keyword in keywords] if keywords else None
+
+    limit = max_messages or len(view)
+    recent = array('I')
+    relevant = array('I')
+    for index in reversed(view.indices()):
+        if store._roles[index] == system_code:
+            continue
+        if len(recent) < limit:
+            recent.append(index)
+        if lowered is None:
+            if len(recent) == limit:
+                break
+            continue
+        content = store._contents[index].lower()
+        if any(keyword in content for keyword in lowered):
+            relevant.append(index)
+            if len(relevant) == limit:
+                break
+
+    chosen = relevant if relevant else recent
+    chosen.reverse()
+    selected = MessageView(store, indices=chosen)
+    if not keep_system:
+        return selected
+    return MessageView(store, indices=_system_indices(view)) + selected
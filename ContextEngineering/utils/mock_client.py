@@ -0,0 +1,81 @@
+"""Mock chat backend with a configurable latency model, for benchmarks."""
+
+import random
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+
+from .cassette import make_chat_response, make_chat_chunk
+from .token_counter import estimate_tokens_for_messages
+
+
+FILLER_WORDS = "context engineering keeps prompts small fast and cheap".split()
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner.create(**kwargs)
+
+
+class MockChatClient:
+    """
+    OpenAI-style client that answers locally after a simulated delay.
+
+    Latency follows a simple linear model: the first token arrives after
+    base_latency + prompt_tokens * prompt_token_latency, and every output
+    token adds output_token_latency. Optional Gaussian jitter (a fraction of
+    the delay) is drawn from a seeded generator so runs are reproducible.
+    """
+
+    def __init__(self, base_latency: float = 0.2, prompt_token_latency: float = 0.00002,
+                 output_token_latency: float = 0.01, output_tokens: int = 50,
+                 jitter: float = 0.05, seed: Optional[int] = 0):
+        self.base_latency = base_latency
+        self.prompt_token_latency = prompt_token_latency
+        self.output_token_latency = output_token_latency
+        self.output_tokens = output_tokens
+        self.jitter = jitter
+        self.calls = 0
+        self._random = random.Random(seed)
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _delay(self, seconds: float) -> float:
+        if self.jitter:
+            seconds *= max(0.0, self._random.gauss(1.0, self.jitter))
+        return seconds
+
+    def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False,
+               max_tokens: Optional[int] = None, **params):
+        start = time.perf_counter()
+        self.calls += 1
+
+        prompt_tokens = estimate_tokens_for_messages(messages, model)
+        output_tokens = min(self.output_tokens, max_tokens or self.output_tokens)
+        # One filler word is one token in the common encodings
+        words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(output_tokens)]
+
+        ttft = self._delay(self.base_latency + prompt_tokens * self.prompt_token_latency)
+        token_gap = self._delay(self.output_token_latency)
+
+        if stream:
+            return self._stream(start, ttft, token_gap, words)
+
+        remaining = start + ttft + token_gap * len(words) - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        return make_chat_response(" ".join(words), model, {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens,
+        })
+
+    def _stream(self, start: float, ttft: float, token_gap: float, words: List[str]):
+        for i, word in enumerate(words):
+            remaining = start + ttft + token_gap * i - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            yield make_chat_chunk(word if i == 0 else " " + word)
+        yield make_chat_chunk(None, "stop")
@@ -0,0 +1,245 @@
+"""Exact-match response cache for chat completions."""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+
+from .cassette import canonical_messages, request_key, make_chat_response, make_chat_chunk, iter_stream_text
+from .visualizer import print_section
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "responses")
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Normalize messages so that formatting-only differences share a cache key.
+
+    Line endings are unified and trailing whitespace is stripped from every
+    line; indentation and inner spacing are kept since they can change meaning
+    in code.
+    """
+    normalized = []
+    for message in canonical_messages(messages):
+        message = dict(message)
+        content = message.get('content')
+        if isinstance(content, str):
+            lines = content.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+            message['content'] = "\n".join(line.rstrip() for line in lines).strip()
+        normalized.append(message)
+    return normalized
+
+
+class ResponseCache:
+    """
+    Two-level cache for chat completions: an in-memory LRU in front of a
+    directory of JSON files.
+
+    Entries are keyed by a canonical hash of model, normalized messages,
+    temperature and max_tokens. Sampled responses (temperature > 0) are only
+    cached when cache_sampled is True, since replaying them removes the
+    variation the caller asked for.
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_CACHE_DIR, max_entries: int = 256,
+                 cache_sampled: bool = False):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.cache_sampled = cache_sampled
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "latency_saved": 0.0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ResponseCache"]:
+        """Create a cache from config.json settings, or None if disabled."""
+        if not config.get('response_cache', True):
+            return None
+
+        directory = config.get('response_cache_dir') or DEFAULT_CACHE_DIR
+        if not os.path.isabs(directory):
+            directory = os.path.join(os.path.dirname(os.path.dirname(DEFAULT_CACHE_DIR)), directory)
+
+        return cls(
+            directory=directory,
+            max_entries=config.get('response_cache_size', 256),
+            cache_sampled=config.get('cache_sampled_responses', False),
+        )
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, Any]], temperature: Optional[float] = None,
+            max_tokens: Optional[int] = None) -> str:
+        """Build the cache key for a request."""
+        return request_key(model, normalize_messages(messages), temperature=temperature, max_tokens=max_tokens)
+
+    def is_cacheable(self, temperature: Optional[float]) -> bool:
+        """Check the caching policy for a request's temperature."""
+        return temperature is None or temperature <= 0 or self.cache_sampled
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look a key up in memory, then on disk (promoting disk hits), counting the hit or miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._count_hit('memory_hits', entry)
+                return entry
+
+        entry = None
+        if self.directory is not None:
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                entry = None
+
+        with self._lock:
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._count_hit('disk_hits', entry)
+            self._remember(key, entry)
+        return entry
+
+    def _count_hit(self, level: str, entry: Dict[str, Any]):
+        # Called with the lock held, like every other stats update
+        self.stats['hits'] += 1
+        self.stats[level] += 1
+        self.stats['latency_saved'] += entry.get('latency', 0.0)
+
+    def count_bypass(self):
+        """Count a request that was not cacheable."""
+        with self._lock:
+            self.stats['bypassed'] += 1
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """Store an entry in memory and on disk."""
+        with self._lock:
+            self._remember(key, entry)
+
+        if self.directory is None:
+            return
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def wrap(self, client) -> "CachedChatClient":
+        """Put this cache in front of an OpenAI-style client."""
+        return CachedChatClient(client, self)
+
+    def print_stats(self):
+        """Print hit/miss counts and the latency saved by cache hits."""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = (stats['hits'] / lookups * 100) if lookups else 0.0
+
+        print_section("Response Cache")
+        print(f"Hits: {stats['hits']} (memory: {stats['memory_hits']}, disk: {stats['disk_hits']})")
+        print(f"Misses: {stats['misses']}")
+        print(f"Bypassed (not cacheable): {stats['bypassed']}")
+        print(f"Hit rate: {hit_rate:.1f}%")
+        print(f"Latency saved: {stats['latency_saved']:.2f}s\n")
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner.create(**kwargs)
+
+
+class CachedChatClient:
+    """OpenAI-style client that serves repeated requests from a ResponseCache."""
+
+    def __init__(self, client, cache: ResponseCache):
+        self.client = client
+        self.cache = cache
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def create(self, model: str, messages: List[Dict[str, Any]], temperature: Optional[float] = None,
+               max_tokens: Optional[int] = None, stream: bool = False, **params):
+        request = dict(params)
+        if temperature is not None:
+            request['temperature'] = temperature
+        if max_tokens is not None:
+            request['max_tokens'] = max_tokens
+
+        # Anything beyond the keyed parameters could change the response
+        if params or not self.cache.is_cacheable(temperature):
+            self.cache.count_bypass()
+            if stream:
+                request['stream'] = True
+            return self.client.chat.completions.create(model=model, messages=messages, **request)
+
+        key = self.cache.key(model, messages, temperature, max_tokens)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if stream:
+                return iter([make_chat_chunk(entry['content'], "stop")])
+            return make_chat_response(entry['content'], model, entry.get('usage'))
+
+        if stream:
+            return self._stream_and_store(key, model, messages, request)
+
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(model=model, messages=messages, **request)
+        latency = time.perf_counter() - start
+
+        usage = {}
+        if getattr(response, 'usage', None) is not None:
+            usage = {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens,
+            }
+        self.cache.put(key, {
+            "model": model,
+            "content": response.choices[0].message.content,
+            "usage": usage,
+            "latency": latency,
+            "created": time.time(),
+        })
+        return response
+
+    def _stream_and_store(self, key: str, model: str, messages: List[Dict[str, Any]], request: Dict[str, Any]):
+        """Pass a live stream through, storing the full response once it completes."""
+        start = time.perf_counter()
+        stream = self.client.chat.completions.create(model=model, messages=messages, stream=True, **request)
+        parts = []
+        for text in iter_stream_text(stream):
+            parts.append(text)
+            yield make_chat_chunk(text)
+
+        self.cache.put(key, {
+            "model": model,
+            "content": "".join(parts),
+            "usage": {},
+            "latency": time.perf_counter() - start,
+            "created": time.time(),
+        })
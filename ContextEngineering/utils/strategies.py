@@ -0,0 +1,182 @@
+"""
+Context selection and compression strategies shared by demos and benchmarks.
+
+Every strategy accepts either a list of message dictionaries or a
+MessageView. Selection strategies given a view return a view over the same
+MessageStore, so trying several strategies on one history never copies it.
+"""
+
+import re
+from typing import List, Dict, Any, Callable, Optional, Union
+
+from .dedup import dedupe_messages
+from .message_store import MessageView, select_relevant_view
+
+
+STOPWORDS = {
+    "about", "also", "can", "could", "does", "from", "have", "how", "into", "just", "like",
+    "me", "more", "please", "show", "that", "the", "then", "there", "this", "what", "when",
+    "where", "which", "with", "would", "you", "your",
+}
+
+
+def select_relevant_messages(messages, keywords=None, max_messages=5, keep_system=True):
+    """
+    Select relevant messages from conversation history.
+
+    Args:
+        messages: List of message dictionaries, or a MessageView
+        keywords: List of keywords to match (if None, use recency)
+        max_messages: Maximum number of messages to keep
+        keep_system: Whether to always keep system messages
+
+    Returns:
+        Filtered list of messages (a view sharing storage when given a MessageView)
+    """
+    if isinstance(messages, MessageView):
+        return select_relevant_view(messages, keywords, max_messages, keep_system)
+
+    selected = []
+
+    # Always keep system message if requested
+    if keep_system:
+        system_msgs = [m for m in messages if m.get('role') == 'system']
+        selected.extend(system_msgs)
+
+    # Get non-system messages
+    other_msgs = [m for m in messages if m.get('role') != 'system']
+
+    if keywords:
+        # Select messages containing keywords
+        relevant = []
+        for msg in other_msgs:
+            content = msg.get('content', '').lower()
+            if any(keyword.lower() in content for keyword in keywords):
+                relevant.append(msg)
+
+        # If we found relevant messages, use them; otherwise fall back to recent
+        if relevant:
+            selected.extend(relevant[-max_messages:])
+        else:
+            selected.extend(other_msgs[-max_messages:])
+    else:
+        # Just take the most recent messages
+        selected.extend(other_msgs[-max_messages:])
+
+    return selected
+
+
+def extract_keywords(text: str, limit: int = 5) -> List[str]:
+    """Pick simple keywords (longer, non-stopword words) from a piece of text."""
+    keywords = []
+    for word in re.findall(r"[a-zA-Z_][a-zA-Z0-9_]+", text.lower()):
+        if len(word) > 3 and word not in STOPWORDS and word not in keywords:
+            keywords.append(word)
+    return keywords[:limit]
+
+
+def summarize_with_client(client, model: str) -> Callable[[List[Dict[str, Any]]], Dict[str, str]]:
+    """
+    Build a summarize(messages) function backed by an OpenAI-style client.
+
+    Returns:
+        Function returning a system message holding the summary
+    """
+    def summarize(messages):
+        conversation_text = "\n".join(
+            f"{m['role']}: {m['content']}" for m in messages if m.get('role') != 'system'
+        )
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{
+                "role": "user",
+                "content": f"Summarize this conversation in 2-3 sentences, preserving key facts:\n\n{conversation_text}"
+            }],
+            temperature=0
+        )
+        return {
+            "role": "system",
+            "content": f"Previous conversation summary: {response.choices[0].message.content}"
+        }
+
+    return summarize
+
+
+def recent_strategy(messages, keywords=None, summarize=None):
+    """System messages plus the last 4 messages."""
+    return select_relevant_messages(messages, max_messages=4)
+
+
+def keyword_strategy(messages, keywords=None, summarize=None):
+    """System messages plus up to 6 messages that mention a keyword."""
+    return select_relevant_messages(messages, keywords=keywords, max_messages=6)
+
+
+def minimal_strategy(messages, keywords=None, summarize=None):
+    """System messages plus the last exchange."""
+    return select_relevant_messages(messages, max_messages=2)
+
+
+def _compress(messages, summarize, keep_recent):
+    if isinstance(messages, MessageView):
+        # Only the summary is new; everything else stays in the store until the result is built
+        system = messages.filter(lambda role, content: role == 'system')
+        others = messages.filter(lambda role, content: role != 'system')
+        if len(others) <= keep_recent:
+            return messages
+        return system.to_messages() + [summarize(others[:-keep_recent])] + others[-keep_recent:].to_messages()
+
+    system = [m for m in messages if m.get('role') == 'system']
+    others = [m for m in messages if m.get('role') != 'system']
+    if len(others) <= keep_recent:
+        return list(messages)
+    return system + [summarize(others[:-keep_recent])] + others[-keep_recent:]
+
+
+def partial_compression_strategy(messages, keywords=None, summarize=None):
+    """Summarize older messages, keep the last 4 verbatim."""
+    return _compress(messages, summarize, keep_recent=4)
+
+
+def aggressive_compression_strategy(messages, keywords=None, summarize=None):
+    """Summarize everything except the last exchange."""
+    return _compress(messages, summarize, keep_recent=2)
+
+
+def dedup_strategy(messages, keywords=None, summarize=None):
+    """Replace repeated code blocks and stack traces with back-references."""
+    deduplicated, _ = dedupe_messages(messages)
+    return deduplicated
+
+
+# name -> (strategy function, whether it calls the LLM)
+STRATEGIES = {
+    "recent": (recent_strategy, False),
+    "keyword": (keyword_strategy, False),
+    "minimal": (minimal_strategy, False),
+    "dedup": (dedup_strategy, False),
+    "compress_partial": (partial_compression_strategy, True),
+    "compress_aggressive": (aggressive_compression_strategy, True),
+}
+
+
+def apply_strategy(name: str, messages: Union[List[Dict[str, Any]], MessageView],
+                   keywords: Optional[List[str]] = None,
+                   summarize: Optional[Callable] = None) -> Union[List[Dict[str, Any]], MessageView]:
+    """
+    Apply a registered strategy to a conversation.
+
+    Args:
+        name: Strategy name from STRATEGIES
+        messages: Conversation messages (list of dictionaries or MessageView)
+        keywords: Keywords for keyword-based selection
+        summarize: Function turning messages into a summary message (compression strategies)
+
+    Returns:
+        The reduced messages: a MessageView for selection strategies given a
+        view, otherwise a list of message dictionaries
+    """
+    strategy, needs_llm = STRATEGIES[name]
+    if needs_llm and summarize is None:
+        raise ValueError(f"Strategy '{name}' needs a summarize function")
+    return strategy(messages, keywords=keywords, summarize=summarize)
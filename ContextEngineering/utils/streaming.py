@@ -0,0 +1,74 @@
+"""Chat completion helpers that measure latency, with optional streaming."""
+
+import sys
+import time
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from .cassette import iter_stream_text
+from .token_counter import count_tokens
+
+
+def _print_text(text: str):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def run_chat_completion(
+    client,
+    model: str,
+    messages: List[Dict[str, Any]],
+    stream: bool = False,
+    on_text: Optional[Callable[[str], None]] = _print_text,
+    **params
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Run a chat completion and measure its latency.
+
+    With stream=True, text is passed to on_text as soon as each chunk arrives
+    (printed to stdout by default). Without streaming, on_text is not called
+    and the time to first token equals the total latency.
+
+    Args:
+        client: OpenAI-style client
+        model: Model name
+        messages: Request messages
+        stream: Whether to request a streamed response
+        on_text: Callback for streamed text, or None to stay silent
+        **params: Extra request parameters (temperature, max_tokens, ...)
+
+    Returns:
+        Tuple of (response text, latency stats) where the stats dictionary has
+        'ttft', 'total' (seconds), 'completion_tokens' and 'tokens_per_second'
+    """
+    start = time.perf_counter()
+    ttft = None
+
+    if stream:
+        parts = []
+        for text in iter_stream_text(client.chat.completions.create(
+            model=model, messages=messages, stream=True, **params
+        )):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            parts.append(text)
+            if on_text is not None:
+                on_text(text)
+        content = "".join(parts)
+    else:
+        response = client.chat.completions.create(model=model, messages=messages, **params)
+        content = response.choices[0].message.content or ""
+
+    total = time.perf_counter() - start
+    if ttft is None:
+        ttft = total
+
+    completion_tokens = count_tokens(content, model)
+    generation_time = total - ttft if stream else total
+
+    return content, {
+        "ttft": ttft,
+        "total": total,
+        "completion_tokens": completion_tokens,
+        "tokens_per_second": completion_tokens / generation_time if generation_time > 0 else 0.0,
+        "streamed": stream,
+    }
@@ -1,7 +1,41 @@
 """Token counting utilities for context management."""
 
 import tiktoken
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+
+
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-turbo-preview": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+
+# USD per 1K tokens: (prompt, completion)
+MODEL_PRICING = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-3.5-turbo-16k": (0.003, 0.004),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-32k": (0.06, 0.12),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4-turbo-preview": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """Get (and cache) the tiktoken encoding for a model."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
 
 
 def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
@@ -15,12 +49,7 @@ def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
     Returns:
         Number of tokens in the text
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
-
-    return len(encoding.encode(text))
+    return len(_get_encoding(model).encode(text))
 
 
 def estimate_tokens_for_messages(messages: List[Dict[str, Any]], model: str = "gpt-3.5-turbo") -> int:
@@ -37,10 +66,7 @@ def estimate_tokens_for_messages(messages: List[Dict[str, Any]], model: str = "g
     Returns:
         Estimated total number of tokens
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
+    encoding = _get_encoding(model)
 
     tokens_per_message = 3  # every message follows <|start|>{role/name}\n{content}<|end|>\n
     tokens_per_name = 1
@@ -68,16 +94,7 @@ def get_context_window_size(model: str) -> int:
     Returns:
         Context window size in tokens
     """
-    context_windows = {
-        "gpt-3.5-turbo": 4096,
-        "gpt-3.5-turbo-16k": 16384,
-        "gpt-4": 8192,
-        "gpt-4-32k": 32768,
-        "gpt-4-turbo": 128000,
-        "gpt-4-turbo-preview": 128000,
-    }
-
-    return context_windows.get(model, 4096)
+    return CONTEXT_WINDOWS.get(model, 4096)
 
 
 def calculate_token_percentage(used_tokens: int, model: str = "gpt-3.5-turbo") -> float:
@@ -93,3 +110,21 @@ def calculate_token_percentage(used_tokens: int, model: str = "gpt-3.5-turbo") -
     """
     window_size = get_context_window_size(model)
     return (used_tokens / window_size) * 100
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int, model: str = "gpt-3.5-turbo") -> Optional[float]:
+    """
+    Estimate the cost of a request in USD.
+
+    Args:
+        prompt_tokens: Number of prompt tokens
+        completion_tokens: Number of completion tokens
+        model: The model name
+
+    Returns:
+        Estimated cost in USD, or None for a model missing from MODEL_PRICING
+    """
+    if model not in MODEL_PRICING:
+        return None
+    prompt_price, completion_price = MODEL_PRICING[model]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
@@ -49,6 +49,21 @@ def visualize_tokens(used_tokens: int, max_tokens: int, label: str = "Context Us
     print(f"Tokens: {used_tokens:,} / {max_tokens:,}\n")
 
 
+def print_latency(stats: Dict[str, Any], label: str = "Latency"):
+    """
+    Print latency stats for one completion next to its token usage.
+
+    Args:
+        stats: Dictionary with 'ttft', 'total', 'completion_tokens' and 'tokens_per_second' keys
+        label: Label for the stats line
+    """
+    ttft = f"{stats['ttft']:.2f}s" if stats.get('streamed') else "n/a"
+    print(f"{Fore.CYAN}{label}:{Style.RESET_ALL} "
+          f"TTFT {ttft} | "
+          f"{stats['tokens_per_second']:.1f} tok/s | "
+          f"Total {stats['total']:.2f}s ({stats['completion_tokens']} output tokens)\n")
+
+
 def print_comparison(before: Dict[str, Any], after: Dict[str, Any]):
     """
     Print a before/after comparison of token usage.